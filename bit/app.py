@@ -1,8 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from main import app as main_app
+from models import lifespan
+from pdf import router as pdf_router
 
-app = FastAPI(title="Answer Evaluation System", version="3.0.0")
+app = FastAPI(title="Answer Evaluation System", version="3.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -12,6 +14,9 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+# Mounted apps do not receive lifespan events, so the shared engines are warmed and
+# released here. Routes are matched in order: /pdf/... before the catch-all mount.
+app.include_router(pdf_router)
 app.mount("/", main_app)
 
 if __name__ == "__main__":
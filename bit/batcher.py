@@ -0,0 +1,112 @@
+"""
+Dynamic micro-batching for sentence embedding models.
+Concurrent callers submit texts to a MicroBatcher; a background thread gathers up to
+max_batch_size texts or waits at most max_wait_ms, runs one encode call for the whole
+group and hands each embedding back to the caller waiting on it.
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Dict, List, Union
+
+import numpy as np
+
+MAX_BATCH_SIZE = int(os.environ.get("MICROBATCH_MAX_SIZE", 32))
+MAX_WAIT_MS = float(os.environ.get("MICROBATCH_MAX_WAIT_MS", 5.0))
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Batches concurrent encode requests in front of a SentenceTransformer-like model"""
+
+    def __init__(self, model, max_batch_size: int = MAX_BATCH_SIZE, max_wait_ms: float = MAX_WAIT_MS):
+        self.model = model
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes: Counter = Counter()
+        self._items = 0
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue one text and return a future resolving to its embedding"""
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, sentences: Union[str, List[str]], convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        """Drop-in for model.encode returning numpy embeddings"""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if len(texts) >= self.max_batch_size:
+            # Already a full batch; queueing would only add latency. Forward passes stay
+            # capped at max_batch_size so padding and attention memory stay bounded
+            embs = self.model.encode(texts, convert_to_numpy=True, batch_size=self.max_batch_size)
+            for start in range(0, len(texts), self.max_batch_size):
+                self._record(min(self.max_batch_size, len(texts) - start))
+        else:
+            futures = [self.submit(text) for text in texts]
+            embs = np.stack([f.result() for f in futures]) if futures else np.empty((0, 0), dtype=np.float32)
+        return embs[0] if single else embs
+
+    def close(self) -> None:
+        self._queue.put(_STOP)
+        self._thread.join(timeout=5)
+
+    def _record(self, size: int) -> None:
+        with self._lock:
+            self._batch_sizes[size] += 1
+            self._items += size
+
+    def _collect(self, first) -> List:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = self._collect(first)
+            texts = [text for text, _ in batch]
+            try:
+                embs = self.model.encode(texts, convert_to_numpy=True, batch_size=len(texts))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self._record(len(batch))
+            for (_, future), emb in zip(batch, embs):
+                future.set_result(emb)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            batches = sum(self._batch_sizes.values())
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "batches": batches,
+                "items": self._items,
+                "mean_batch_size": round(self._items / batches, 2) if batches else 0.0,
+                "batch_size_histogram": {str(size): count for size, count in sorted(self._batch_sizes.items())},
+            }
@@ -0,0 +1,263 @@
+"""
+Micro-benchmarks for the PDF pipeline.
+
+    python benchmarks.py rasterize [--pdf sheet.pdf] [--pages 20] [--repeat 3]
+    python benchmarks.py segment [--pages 50] [--questions 30] [--repeat 3]
+    python benchmarks.py classify [--pdf sheet.pdf] [--pages 20] [--repeat 3]
+    python benchmarks.py fuzzy [--trials 2000] [--repeat 3]
+"""
+
+import argparse
+import io
+import random
+import re
+import string
+import time
+from typing import Optional, Tuple
+
+import fitz
+from fuzzywuzzy import fuzz
+from PIL import Image
+
+import page_classifier
+from keywords import FUZZY_THRESHOLD, FuzzyKeywordIndex
+from page_reader import RENDER_ZOOM, pixmap_to_array, render_page
+from pdf import segment_answers
+
+
+def synthetic_pdf(pages: int, blank_every: int = 0) -> bytes:
+    """Build an A4 PDF with a page of handwriting-sized text per page (every nth page left blank)"""
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page(width=595, height=842)
+        if blank_every and (page_num + 1) % blank_every == 0:
+            continue
+        lines = [f"Q{page_num + 1}. Answer line {i}: photosynthesis converts light into chemical energy."
+                 for i in range(40)]
+        page.insert_text((40, 60), "\n".join(lines), fontsize=11)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def render_page_png(page: "fitz.Page", zoom: float = RENDER_ZOOM) -> Image.Image:
+    """Previous rasterization path: RGB pixmap -> PNG bytes -> PIL decode"""
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+    image = Image.open(io.BytesIO(pix.tobytes("png")))
+    image.load()
+    return image
+
+
+def _pages_per_second(pdf_bytes: bytes, render, repeat: int) -> float:
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in doc:
+            render(page)
+        best = min(best, time.perf_counter() - start)
+    pages = len(doc)
+    doc.close()
+    return pages / best
+
+
+def bench_rasterize(pdf_bytes: bytes, repeat: int = 3) -> None:
+    before = _pages_per_second(pdf_bytes, render_page_png, repeat)
+    after = _pages_per_second(pdf_bytes, render_page, repeat)
+    print(f"PNG round trip (before): {before:8.2f} pages/sec")
+    print(f"Direct grayscale (after): {after:8.2f} pages/sec")
+    print(f"Speed-up: {after / before:.2f}x")
+
+
+def synthetic_sheet_text(pages: int, questions: int) -> str:
+    """Answer-sheet text of roughly 2,000 characters per page, answers spread evenly"""
+    sentence = "The chloroplast absorbs light energy and converts carbon dioxide and water into glucose. "
+    body = sentence * (pages * 22 // questions)
+    return "\n".join(f"Q{q}. {body}" for q in range(1, questions + 1))
+
+
+def legacy_locate_answer(all_text: str, question_num: int, next_question_num: Optional[int] = None) -> Tuple[str, int]:
+    """Previous per-question regex extraction (up to three DOTALL searches plus a line scan)"""
+    if next_question_num:
+        pattern_end = fr'(?:q\.?\s*{next_question_num}|question\s*{next_question_num}|{next_question_num}\.)'
+    else:
+        pattern_end = r'\Z'
+
+    patterns = [
+        rf'(?i)q\.?\s*{question_num}[\s:.\)]+(.+?)(?={pattern_end})',
+        rf'(?i)question\s*{question_num}[\s:.\)]+(.+?)(?={pattern_end})',
+        rf'(?i){question_num}\.?\s+(.+?)(?={pattern_end})',
+    ]
+
+    for pattern in patterns:
+        match = re.search(pattern, all_text, re.DOTALL)
+        if match:
+            return match.group(1).strip(), match.start(1)
+
+    lines = all_text.split('\n')
+    in_answer = False
+    answer_lines = []
+    start = -1
+    offset = 0
+    for line in lines:
+        line_offset = offset
+        offset += len(line) + 1
+        if re.search(rf'(?i)q\.?\s*{question_num}[\s:.\)]', line):
+            in_answer = True
+            continue
+        if next_question_num and re.search(rf'(?i)q\.?\s*{next_question_num}[\s:.\)]', line):
+            break
+        if in_answer:
+            if start < 0:
+                start = line_offset
+            answer_lines.append(line)
+    return ' '.join(answer_lines), start
+
+
+def bench_segment(pages: int, questions: int, repeat: int = 3) -> None:
+    text = synthetic_sheet_text(pages, questions)
+    numbers = list(range(1, questions + 1))
+
+    def before():
+        for idx, q_num in enumerate(numbers):
+            legacy_locate_answer(text, q_num, numbers[idx + 1] if idx + 1 < len(numbers) else None)
+
+    def after():
+        segment_answers(text, numbers)
+
+    for label, fn in (("Per-question regex (before)", before), ("Single-pass segmenter (after)", after)):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        print(f"{label}: {best * 1000:10.2f} ms for {len(text):,} chars, {questions} questions")
+
+
+def bench_classify(pdf_bytes: bytes, repeat: int = 3) -> None:
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    zoom = page_classifier.CLASSIFY_ZOOM
+    start = time.perf_counter()
+    arrays = [pixmap_to_array(page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False))
+              for page in doc]
+    render_ms = (time.perf_counter() - start) * 1000.0 / len(arrays)
+    doc.close()
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        kinds = [page_classifier.classify(gray) for gray in arrays]
+        best = min(best, time.perf_counter() - start)
+    counts = {kind: kinds.count(kind) for kind in (page_classifier.BLANK, page_classifier.TEXT, page_classifier.DIAGRAM)}
+    print(f"Low-resolution render: {render_ms:8.3f} ms/page ({arrays[0].shape[1]}x{arrays[0].shape[0]} px)")
+    print(f"Classification:        {best * 1000.0 / len(arrays):8.3f} ms/page")
+    print(f"Pages: {counts}; OCR calls saved: {counts['blank']} of {len(arrays)}")
+
+
+
+def legacy_fuzzy_coverage(ref: str, ans: str) -> float:
+    """Previous fuzzy keyword coverage: fuzz.ratio for every (reference, answer) word pair"""
+    ref_words = ref.lower().split()
+    ans_words = ans.lower().split()
+    matched = 0
+    for word in ref_words:
+        if any(fuzz.ratio(word, a) > FUZZY_THRESHOLD for a in ans_words):
+            matched += 1
+    return matched / len(ref_words) if ref_words else 0
+
+
+def misspell(word: str, rng: random.Random, alphabet: str) -> str:
+    """Up to two random character insertions, deletions or substitutions"""
+    chars = list(word)
+    for _ in range(rng.randint(0, 2)):
+        i = rng.randrange(len(chars) + 1)
+        op = rng.random()
+        if op < 1 / 3:
+            chars.insert(i, rng.choice(alphabet))
+        elif chars and op < 2 / 3:
+            del chars[min(i, len(chars) - 1)]
+        elif chars:
+            chars[min(i, len(chars) - 1)] = rng.choice(alphabet)
+    return "".join(chars) or rng.choice(alphabet)
+
+
+def random_pair(rng: random.Random, alphabet: str, max_words: int = 40) -> Tuple[str, str]:
+    """A random reference and an answer made of misspelt reference words and random words"""
+    def word() -> str:
+        return "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 14)))
+    ref = [word() for _ in range(rng.randint(0, max_words))]
+    ans = [misspell(rng.choice(ref), rng, alphabet) if ref and rng.random() < 0.7 else word()
+           for _ in range(rng.randint(0, max_words))]
+    return " ".join(ref), " ".join(ans)
+
+
+def check_fuzzy_index(trials: int, seed: int = 0) -> int:
+    """Compare FuzzyKeywordIndex with the legacy loop on random pairs; returns the mismatch count"""
+    rng = random.Random(seed)
+    mismatches = 0
+    for trial in range(trials):
+        # Small alphabets make near-matches, and so borderline ratios, common
+        alphabet = string.ascii_lowercase[:rng.choice((2, 3, 5, 26))]
+        ref, ans = random_pair(rng, alphabet)
+        expected = legacy_fuzzy_coverage(ref, ans)
+        actual = FuzzyKeywordIndex(ref).coverage(ans)
+        if abs(expected - actual) > 1e-12:
+            mismatches += 1
+            print(f"Mismatch: ref={ref!r} ans={ans!r} legacy={expected} index={actual}")
+    return mismatches
+
+
+def bench_fuzzy(trials: int, repeat: int = 3) -> None:
+    mismatches = check_fuzzy_index(trials)
+    print(f"Equivalence: {trials - mismatches}/{trials} random pairs match the legacy loop")
+
+    rng = random.Random(1)
+    pairs = [random_pair(rng, string.ascii_lowercase, max_words=120) for _ in range(50)]
+
+    def before():
+        for ref, ans in pairs:
+            legacy_fuzzy_coverage(ref, ans)
+
+    def after():
+        for ref, ans in pairs:
+            FuzzyKeywordIndex(ref).coverage(ans)
+
+    for label, fn in (("Pairwise fuzz.ratio (before)", before), ("Bigram index (after)", after)):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        print(f"{label}: {best * 1000:10.2f} ms for {len(pairs)} answers")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PDF pipeline benchmarks")
+    parser.add_argument("benchmark", choices=["rasterize", "segment", "classify", "fuzzy"])
+    parser.add_argument("--pdf", help="PDF to benchmark (default: synthetic sheet)")
+    parser.add_argument("--pages", type=int, default=None, help="pages in the synthetic sheet (20 / 50)")
+    parser.add_argument("--questions", type=int, default=30, help="questions in the synthetic sheet")
+    parser.add_argument("--trials", type=int, default=2000, help="random pairs checked against the legacy loop")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.benchmark == "rasterize":
+        if args.pdf:
+            with open(args.pdf, "rb") as f:
+                pdf_bytes = f.read()
+        else:
+            pdf_bytes = synthetic_pdf(args.pages or 20)
+        bench_rasterize(pdf_bytes, args.repeat)
+    elif args.benchmark == "segment":
+        bench_segment(args.pages or 50, args.questions, args.repeat)
+    elif args.benchmark == "classify":
+        if args.pdf:
+            with open(args.pdf, "rb") as f:
+                pdf_bytes = f.read()
+        else:
+            pdf_bytes = synthetic_pdf(args.pages or 20, blank_every=4)
+        bench_classify(pdf_bytes, args.repeat)
+    elif args.benchmark == "fuzzy":
+        bench_fuzzy(args.trials, args.repeat)
@@ -0,0 +1,117 @@
+"""
+Embedding cache shared by the evaluation API (main.py) and the PDF module (pdf.py).
+Entries are keyed by (model id, hash of the normalized text) and bounded by a byte
+budget; the least recently used embeddings are evicted first.
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_BUDGET_BYTES = int(os.environ.get("EMBEDDING_CACHE_BYTES", 64 * 1024 * 1024))
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different copies share an entry"""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def text_key(model_id: str, text: str) -> Tuple[str, str]:
+    """Cache key for a text under a given model"""
+    digest = hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+    return model_id, digest
+
+
+class EmbeddingCache:
+    """Thread-safe LRU cache of embeddings bounded by total array bytes"""
+
+    def __init__(self, budget_bytes: int = DEFAULT_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self._entries: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, model_id: str, text: str) -> Optional[np.ndarray]:
+        key = text_key(model_id, text)
+        with self._lock:
+            emb = self._entries.get(key)
+            if emb is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return emb
+
+    def put(self, model_id: str, text: str, emb: np.ndarray) -> None:
+        emb = np.asarray(emb)
+        if emb.nbytes > self.budget_bytes:
+            return
+        key = text_key(model_id, text)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = emb
+            self._bytes += emb.nbytes
+            while self._bytes > self.budget_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def encode(self, model_id: str, model, texts: List[str]) -> np.ndarray:
+        """Return embeddings for texts, encoding only the cache misses in one call"""
+        return self.encode_with(model_id, model, texts, [])[0]
+
+    def encode_with(self, model_id: str, model, cached_texts: List[str],
+                    uncached_texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Embed cached_texts through the cache and uncached_texts directly, in one encode call"""
+        found: Dict[str, np.ndarray] = {}
+        missing: List[str] = []
+        for text in dict.fromkeys(cached_texts):
+            emb = self.get(model_id, text)
+            if emb is None:
+                missing.append(text)
+            else:
+                found[text] = emb
+        known = found.keys() | set(missing)
+        extra = list(dict.fromkeys(t for t in uncached_texts if t not in known))
+        if missing or extra:
+            encoded = model.encode(missing + extra, convert_to_numpy=True)
+            for text, emb in zip(missing, encoded):
+                self.put(model_id, text, emb)
+            found.update(zip(missing + extra, encoded))
+
+        def stack(texts: List[str]) -> np.ndarray:
+            if not texts:
+                return np.empty((0, 0), dtype=np.float32)
+            return np.stack([found[text] for text in texts])
+        return stack(cached_texts), stack(uncached_texts)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,96 @@
+"""
+Dedicated executors for the CPU-bound stages of an evaluation.
+OCR and all PyMuPDF work (which holds the GIL) run in a process pool; pure-Python
+text parsing, embedding and CNN inference run in their own thread pools, so a slow
+stage only queues work of its own kind instead of starving Starlette's shared thread
+pool and the event loop.
+"""
+
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+PDF_THREADS = int(os.environ.get("PDF_THREADS", 2))
+EMBEDDING_THREADS = int(os.environ.get("EMBEDDING_THREADS", 32))
+CNN_THREADS = int(os.environ.get("CNN_THREADS", 2))
+
+pdf_pool = ThreadPoolExecutor(max_workers=PDF_THREADS, thread_name_prefix="pdf")
+embedding_pool = ThreadPoolExecutor(max_workers=EMBEDDING_THREADS, thread_name_prefix="embedding")
+cnn_pool = ThreadPoolExecutor(max_workers=CNN_THREADS, thread_name_prefix="cnn")
+
+_ocr_pool: Optional[ProcessPoolExecutor] = None
+_ocr_lock = threading.Lock()
+ocr_pool_restarts = 0
+
+
+def get_ocr_pool() -> ProcessPoolExecutor:
+    """OCR process pool, started on first use; each worker keeps tesseract loaded"""
+    global _ocr_pool
+    with _ocr_lock:
+        if _ocr_pool is not None and _ocr_pool._broken:
+            # A worker died; a broken pool rejects every job, so start a new one
+            _discard(_ocr_pool)
+            _ocr_pool = None
+        if _ocr_pool is None:
+            from ocr import init_worker
+            # spawn: forking a process that already holds torch/TF threads can deadlock
+            _ocr_pool = ProcessPoolExecutor(
+                max_workers=OCR_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+            )
+        return _ocr_pool
+
+
+def _discard(pool: ProcessPoolExecutor) -> None:
+    """Terminate a pool's workers; its pending jobs fail with BrokenProcessPool"""
+    global ocr_pool_restarts
+    ocr_pool_restarts += 1
+    processes = list((pool._processes or {}).values())
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    pool.shutdown(wait=False)
+
+
+def reset_ocr_pool(pool: ProcessPoolExecutor) -> None:
+    """
+    Replace the OCR pool after one of its jobs timed out or a worker died. A hung
+    tesseract cannot be interrupted, so the pool's workers are terminated and the
+    next job starts a fresh pool. Does nothing if the pool was already replaced.
+    """
+    global _ocr_pool
+    with _ocr_lock:
+        if _ocr_pool is not pool:
+            return
+        _ocr_pool = None
+        _discard(pool)
+
+
+def ocr_pool_error() -> Optional[str]:
+    """Why the OCR pool cannot take jobs, or None; a broken pool is replaced on next use"""
+    with _ocr_lock:
+        if _ocr_pool is not None and _ocr_pool._broken:
+            return f"OCR worker pool broken: {_ocr_pool._broken}"
+    return None
+
+
+async def run_in(executor: Executor, fn: Callable, *args, **kwargs):
+    """Run fn(*args, **kwargs) on executor without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+
+def shutdown_executors() -> None:
+    global _ocr_pool
+    for pool in (pdf_pool, embedding_pool, cnn_pool):
+        pool.shutdown(wait=False, cancel_futures=True)
+    with _ocr_lock:
+        if _ocr_pool is not None:
+            _ocr_pool.shutdown(wait=False, cancel_futures=True)
+            _ocr_pool = None
@@ -0,0 +1,249 @@
+"""
+Offline bulk grading of a directory of answer sheets.
+
+    python grade_cli.py SHEETS_DIR --question-paper qp.pdf --reference ref.pdf
+        [--out results.csv|results.parquet] [--workers 4] [--extraction-mode text|layout]
+
+The question paper and reference answers are parsed once. Sheets are then graded
+across worker processes, each loading the embedding model once, with the same
+extraction and scoring functions as the /pdf API. Every finished sheet is appended to a
+JSONL checkpoint (--checkpoint, default <out>.checkpoint.jsonl); rerunning the same
+command skips sheets already graded and retries failed ones. The checkpoint starts
+with a fingerprint of the question paper, reference and extraction mode, and a run
+with different inputs refuses to resume from it (--restart discards it instead).
+Two tables are written
+from the checkpoint: one row per student (--out) and one row per question
+(<out>_questions).
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+# Every grading worker is a process of its own, so by default each gets one OCR worker
+os.environ.setdefault("OCR_WORKERS", "1")
+
+from fastapi import HTTPException
+
+import pdf
+
+logger = logging.getLogger(__name__)
+
+STUDENT_COLUMNS = [
+    "file", "student_name", "exam_name", "total_obtained_marks", "total_max_marks", "percentage",
+    "grade", "processing_time", "blank_pages", "diagram_pages", "error",
+]
+QUESTION_COLUMNS = [
+    "file", "student_name", "question_number", "max_marks", "obtained_marks", "similarity_score",
+    "coverage_score", "feedback", "ocr_confidence", "ocr_variant", "extracted_answer",
+]
+
+# Per-worker state, set once by init_worker
+_exam: Optional[pdf.ExamTemplate] = None
+_extraction_mode = pdf.EXTRACTION_MODE
+
+
+def init_worker(exam: pdf.ExamTemplate, extraction_mode: str, torch_threads: int) -> None:
+    """Load the embedding model and embed the references once per worker process"""
+    global _exam, _extraction_mode
+    logging.basicConfig(level=logging.WARNING)
+    if torch_threads:
+        import torch
+        torch.set_num_threads(torch_threads)
+    pdf.registry.get(pdf.PDF_ENGINE)  # fail the worker early if the model cannot load
+    _exam = exam._replace(ref_embeddings=pdf.embed_references(exam.ref_answers))
+    _extraction_mode = extraction_mode
+
+
+def grade_file(path: str, key: str) -> Dict:
+    """Grade one sheet in a worker; returns its checkpoint record"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    record = {"file": key, "student_name": name}
+    try:
+        result = asyncio.run(pdf.grade_answer_sheet(_exam, path, name, extraction_mode=_extraction_mode))
+        record["result"] = result.model_dump()
+    except HTTPException as e:
+        record["error"] = str(e.detail)
+    except Exception as e:
+        record["error"] = str(e)
+    return record
+
+
+def find_sheets(directory: str) -> Dict[str, str]:
+    """Answer sheet PDFs under directory, keyed by path relative to it"""
+    sheets = {}
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.lower().endswith(".pdf") and not name.startswith("."):
+                path = os.path.join(root, name)
+                sheets[os.path.relpath(path, directory)] = path
+    return dict(sorted(sheets.items()))
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(args: argparse.Namespace) -> Dict[str, str]:
+    """Inputs that change every grade: a checkpoint is only resumed when they match"""
+    return {
+        "question_paper": file_sha256(args.question_paper),
+        "reference": file_sha256(args.reference),
+        "extraction_mode": args.extraction_mode,
+    }
+
+
+def read_fingerprint(path: str) -> Optional[Dict[str, str]]:
+    """Fingerprint on the first line of a checkpoint, if it has one"""
+    with open(path, encoding="utf-8") as f:
+        try:
+            header = json.loads(f.readline())
+        except ValueError:
+            return None
+    return header.get("fingerprint") if isinstance(header, dict) else None
+
+
+def read_checkpoint(path: str) -> Dict[str, Dict]:
+    """Latest record per sheet; a truncated last line from an interrupted run is ignored"""
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if "file" in record:
+                records[record["file"]] = record
+    return records
+
+
+def end_partial_line(path: str) -> None:
+    """Terminate a line cut short by an interrupted run, so new records start on their own line"""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+def build_rows(records: List[Dict]):
+    students, questions = [], []
+    for record in records:
+        result = record.get("result") or {}
+        students.append({
+            "file": record["file"],
+            "student_name": record["student_name"],
+            "exam_name": result.get("exam_name"),
+            "total_obtained_marks": result.get("total_obtained_marks"),
+            "total_max_marks": result.get("total_max_marks"),
+            "percentage": result.get("percentage"),
+            "grade": result.get("grade"),
+            "processing_time": result.get("processing_time"),
+            "blank_pages": " ".join(map(str, result.get("blank_pages", []))),
+            "diagram_pages": " ".join(map(str, result.get("diagram_pages", []))),
+            "error": record.get("error"),
+        })
+        for q in result.get("questions_results", []):
+            questions.append({"file": record["file"], "student_name": record["student_name"],
+                              **{column: q.get(column) for column in QUESTION_COLUMNS[2:]}})
+    return students, questions
+
+
+def write_table(rows: List[Dict], columns: List[str], path: str) -> None:
+    if path.endswith(".parquet"):
+        import pandas as pd  # needs pyarrow or fastparquet
+        pd.DataFrame(rows, columns=columns).to_parquet(path, index=False)
+        return
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def questions_path(out: str) -> str:
+    stem, ext = os.path.splitext(out)
+    return f"{stem}_questions{ext}"
+
+
+def run(args: argparse.Namespace) -> int:
+    checkpoint = args.checkpoint or f"{args.out}.checkpoint.jsonl"
+    expected = fingerprint(args)
+    if args.restart and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    if os.path.exists(checkpoint) and os.path.getsize(checkpoint) > 0:
+        if read_fingerprint(checkpoint) != expected:
+            logger.error(f"{checkpoint} was written for a different question paper, reference or "
+                         f"extraction mode; rerun with --restart to grade every sheet again")
+            return 2
+    else:
+        with open(checkpoint, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"fingerprint": expected}) + "\n")
+    sheets = find_sheets(args.sheets_dir)
+    done = {key for key, record in read_checkpoint(checkpoint).items() if "result" in record}
+    pending = {key: path for key, path in sheets.items() if key not in done}
+    logger.info(f"{len(sheets)} answer sheets, {len(done)} already graded, {len(pending)} to grade")
+
+    if pending:
+        exam = asyncio.run(pdf.build_exam(
+            args.question_paper, args.reference, os.path.basename(args.reference), args.exam_name
+        ))
+        logger.info(f"Exam '{args.exam_name}': {len(exam.questions)} questions")
+        start = time.perf_counter()
+        failed = 0
+        end_partial_line(checkpoint)
+        with open(checkpoint, "a", encoding="utf-8") as ckpt, ProcessPoolExecutor(
+            max_workers=args.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(exam, args.extraction_mode, args.torch_threads),
+        ) as pool:
+            futures = [pool.submit(grade_file, path, key) for key, path in pending.items()]
+            for count, future in enumerate(as_completed(futures), start=1):
+                record = future.result()
+                ckpt.write(json.dumps(record) + "\n")
+                ckpt.flush()
+                if "error" in record:
+                    failed += 1
+                    logger.warning(f"{record['file']}: {record['error']}")
+                if count % args.log_every == 0 or count == len(futures):
+                    rate = count / (time.perf_counter() - start)
+                    logger.info(f"Graded {count}/{len(futures)} ({rate:.2f} sheets/s, {failed} failed)")
+
+    records = read_checkpoint(checkpoint)
+    students, questions = build_rows([records[key] for key in sheets if key in records])
+    write_table(students, STUDENT_COLUMNS, args.out)
+    write_table(questions, QUESTION_COLUMNS, questions_path(args.out))
+    logger.info(f"Wrote {len(students)} students to {args.out} and {len(questions)} questions to {questions_path(args.out)}")
+    return 1 if any(row["error"] for row in students) else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Grade a directory of answer sheet PDFs offline")
+    parser.add_argument("sheets_dir", help="directory of answer sheet PDFs, one per student (searched recursively)")
+    parser.add_argument("--question-paper", required=True, help="question paper PDF")
+    parser.add_argument("--reference", required=True, help="reference answers PDF or .txt")
+    parser.add_argument("--out", default="results.csv", help="per-student table, .csv or .parquet")
+    parser.add_argument("--checkpoint", help="JSONL progress file (default: <out>.checkpoint.jsonl)")
+    parser.add_argument("--restart", action="store_true", help="discard the checkpoint and grade every sheet again")
+    parser.add_argument("--exam-name", default="Exam Evaluation")
+    parser.add_argument("--extraction-mode", choices=pdf.EXTRACTION_MODES, default=pdf.EXTRACTION_MODE)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--torch-threads", type=int, default=1, help="torch threads per worker (0: torch default)")
+    parser.add_argument("--log-every", type=int, default=50)
+    raise SystemExit(run(parser.parse_args()))
@@ -0,0 +1,130 @@
+"""
+Pluggable grammar scoring.
+The default scorer is rule-based and fully local (no network access). Scorers cache
+results per text, score batches in one call and record their own latency, which is
+reported separately under /metrics. Select a scorer with GRAMMAR_SCORER
+("rules" or "gingerit").
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+GRAMMAR_SCORER = os.environ.get("GRAMMAR_SCORER", "rules").lower()
+GRAMMAR_CACHE_SIZE = int(os.environ.get("GRAMMAR_CACHE_SIZE", 4096))
+GRAMMAR_TIMEOUT_MS = float(os.environ.get("GRAMMAR_TIMEOUT_MS", 500))
+
+SENTENCE_SPLIT = re.compile(r'[.!?]')
+
+
+class GrammarScorer:
+    """Base class: per-text cache, batch scoring and latency metrics"""
+
+    name = "base"
+
+    def __init__(self, cache_size: int = GRAMMAR_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._latencies_ms: deque = deque(maxlen=1000)
+        self._calls = 0
+        self._cache_hits = 0
+
+    def _score(self, text: str) -> float:
+        raise NotImplementedError
+
+    def score(self, text: str) -> float:
+        return self.score_many([text])[0]
+
+    def score_many(self, texts: List[str]) -> List[float]:
+        start = time.perf_counter()
+        scores = []
+        for text in texts:
+            with self._lock:
+                cached = self._cache.get(text)
+                if cached is not None:
+                    self._cache.move_to_end(text)
+                    self._cache_hits += 1
+            if cached is None:
+                cached = self._score(text)
+                with self._lock:
+                    self._cache[text] = cached
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+            scores.append(cached)
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        with self._lock:
+            self._calls += len(texts)
+            self._latencies_ms.append(elapsed_ms)
+        return scores
+
+    def stats(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies_ms)
+            calls, hits = self._calls, self._cache_hits
+        def percentile(p: float) -> float:
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3) if latencies else 0.0
+        return {
+            "scorer": self.name,
+            "texts_scored": calls,
+            "cache_hits": hits,
+            "latency_ms_p50": percentile(0.5),
+            "latency_ms_p95": percentile(0.95),
+            "latency_ms_max": round(latencies[-1], 3) if latencies else 0.0,
+        }
+
+
+class RuleBasedGrammarScorer(GrammarScorer):
+    """Share of sentences that start with a capital letter"""
+
+    name = "rules"
+
+    def _score(self, text: str) -> float:
+        sentences = [s.strip() for s in SENTENCE_SPLIT.split(text)]
+        sentences = [s for s in sentences if s]
+        capitalized = sum(1 for s in sentences if s[0].isupper())
+        ratio = capitalized / len(sentences) if sentences else 1
+        return round(ratio, 2)
+
+
+class GingerItGrammarScorer(GrammarScorer):
+    """Remote GingerIt corrections with a hard deadline, falling back to the rules"""
+
+    name = "gingerit"
+
+    def __init__(self, timeout_ms: float = GRAMMAR_TIMEOUT_MS, cache_size: int = GRAMMAR_CACHE_SIZE):
+        super().__init__(cache_size)
+        from gingerit.gingerit import GingerIt
+        self._parser = GingerIt()
+        self._timeout = timeout_ms / 1000.0
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="gingerit")
+        self._fallback = RuleBasedGrammarScorer(cache_size=0)
+
+    def _score(self, text: str) -> float:
+        try:
+            result = self._pool.submit(self._parser.parse, text).result(timeout=self._timeout)
+            corrections = result.get("corrections", [])
+            return max(0, 1 - len(corrections)/max(1, len(text.split())))
+        except Exception as e:
+            logger.warning(f"GingerIt unavailable, using rule-based score: {e}")
+            return self._fallback._score(text)
+
+
+def create_scorer(kind: Optional[str] = None) -> GrammarScorer:
+    kind = (kind or GRAMMAR_SCORER).lower()
+    if kind == "gingerit":
+        try:
+            return GingerItGrammarScorer()
+        except ImportError as e:
+            logger.warning(f"GingerIt not installed, using rule-based grammar scorer: {e}")
+    return RuleBasedGrammarScorer()
+
+
+grammar_scorer = create_scorer()
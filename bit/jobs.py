@@ -0,0 +1,105 @@
+"""
+Background evaluation jobs.
+A Job runs as an asyncio task after its request has returned. It records timestamped
+stage events that any number of clients can follow as a stream, and keeps the final
+result (or error) until it is evicted from the JobStore, oldest first.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+JOB_STORE_SIZE = int(os.environ.get("JOB_STORE_SIZE", 256))
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class Job:
+    """State, stage events and result of one background evaluation"""
+
+    def __init__(self):
+        self.job_id = uuid.uuid4().hex
+        self.status = QUEUED
+        self.created_at = datetime.now().isoformat()
+        self.events: List[Dict] = []
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+        self._start = time.perf_counter()
+        self._last = self._start
+        self._changed = asyncio.Event()
+        self.emit(QUEUED)
+
+    @property
+    def done(self) -> bool:
+        return self.status in (COMPLETED, FAILED)
+
+    def emit(self, stage: str, **data) -> None:
+        """Record a stage event with the time since the job started and since the last event"""
+        now = time.perf_counter()
+        self.events.append({
+            "stage": stage,
+            "elapsed_s": round(now - self._start, 3),
+            "stage_s": round(now - self._last, 3),
+            **data,
+        })
+        self._last = now
+        # Wake every stream waiting for a new event
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def start(self) -> None:
+        self.status = RUNNING
+        self.emit(RUNNING)
+
+    def finish(self, result: Any) -> None:
+        self.result = result
+        self.status = COMPLETED
+        self.emit(COMPLETED)
+
+    def fail(self, error: str) -> None:
+        self.error = error
+        self.status = FAILED
+        self.emit(FAILED, detail=error)
+
+    async def follow(self) -> AsyncIterator[Dict]:
+        """Every event from the first, then new ones as they happen, until the job ends"""
+        sent = 0
+        while True:
+            changed = self._changed
+            while sent < len(self.events):
+                yield self.events[sent]
+                sent += 1
+            if self.done:
+                return
+            await changed.wait()
+
+
+class JobStore:
+    """Jobs by ID; once full, the oldest finished jobs are dropped first"""
+
+    def __init__(self, max_jobs: int = JOB_STORE_SIZE):
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+    def create(self) -> Job:
+        job = Job()
+        self._jobs[job.job_id] = job
+        for job_id in [job_id for job_id, old in self._jobs.items() if old.done]:
+            if len(self._jobs) <= self.max_jobs:
+                break
+            del self._jobs[job_id]
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+
+job_store = JobStore()
@@ -0,0 +1,138 @@
+"""
+Precompiled keyword indexes for coverage scoring.
+A reference answer's keywords are extracted once (same tokenizer and English stop
+words as the TfidfVectorizer used before), cached per reference text, and coverage
+is then a single pass over the student answer's token set.
+
+FuzzyKeywordIndex does the same for fuzzy coverage: exact matches are resolved with
+set operations, and an inverted index from character bigrams to reference words
+yields, for each answer word, only the reference words sharing enough bigrams to
+reach a fuzz.ratio above FUZZY_THRESHOLD. fuzz.ratio runs on those candidates only.
+"""
+
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+from fuzzywuzzy import fuzz
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+# TfidfVectorizer's default token_pattern
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+KEYWORD_INDEX_CACHE_SIZE = 1024
+FUZZY_THRESHOLD = 80
+
+
+def tokenize(text: str) -> FrozenSet[str]:
+    """Lowercased token set of a text"""
+    return frozenset(TOKEN_PATTERN.findall(text.lower()))
+
+
+class KeywordIndex:
+    """Keyword set of one reference answer"""
+
+    __slots__ = ("keywords",)
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: FrozenSet[str] = frozenset(keywords)
+
+    @classmethod
+    def from_reference(cls, reference: str) -> "KeywordIndex":
+        return cls(tokenize(reference) - ENGLISH_STOP_WORDS)
+
+    def coverage(self, answer: str) -> float:
+        if not self.keywords:
+            return 0
+        return len(self.keywords & tokenize(answer)) / len(self.keywords)
+
+    def coverage_many(self, answers: Iterable[str]) -> List[float]:
+        return [self.coverage(answer) for answer in answers]
+
+
+@lru_cache(maxsize=KEYWORD_INDEX_CACHE_SIZE)
+def keyword_index(reference: str) -> KeywordIndex:
+    """Keyword index for a reference answer, built once and cached"""
+    return KeywordIndex.from_reference(reference)
+
+
+def min_shared_matches(total_len: int) -> int:
+    """Fewest matched characters M giving fuzz.ratio > FUZZY_THRESHOLD for a pair of total length T"""
+    # fuzz.ratio is round(100 * 2M / T); round() only exceeds FUZZY_THRESHOLD
+    # when 100 * 2M / T > FUZZY_THRESHOLD + 0.5
+    return (2 * FUZZY_THRESHOLD + 1) * total_len // 400 + 1
+
+
+def min_shared_bigrams(total_len: int) -> int:
+    """
+    Lower bound on the bigrams (counted with multiplicity) two words of total length T
+    share when fuzz.ratio > FUZZY_THRESHOLD. The M matched characters form b blocks
+    that are common substrings of both words, so at least M - b bigrams are shared.
+    Consecutive blocks are separated by at least one of the T - 2M unmatched
+    characters, so b <= T - 2M + 1 and the words share at least 3M - T - 1 bigrams.
+    """
+    return 3 * min_shared_matches(total_len) - total_len - 1
+
+
+def bigrams(word: str) -> Counter:
+    return Counter(word[i:i + 2] for i in range(len(word) - 1))
+
+
+class FuzzyKeywordIndex:
+    """Reference vocabulary with an inverted character bigram index for fuzzy coverage"""
+
+    __slots__ = ("words", "total", "postings", "by_length")
+
+    def __init__(self, reference: str):
+        words = reference.lower().split()
+        self.words: Counter = Counter(words)
+        self.total = len(words)
+        # bigram -> [(reference word, occurrences of the bigram in it)]
+        self.postings: Dict[str, List[Tuple[str, int]]] = {}
+        self.by_length: Dict[int, List[str]] = {}
+        for word in self.words:
+            self.by_length.setdefault(len(word), []).append(word)
+            for gram, count in bigrams(word).items():
+                self.postings.setdefault(gram, []).append((word, count))
+
+    def candidates(self, answer_word: str) -> Set[str]:
+        """Reference words whose length and bigrams leave fuzz.ratio > FUZZY_THRESHOLD reachable"""
+        a_length = len(answer_word)
+        shared: Counter = Counter()
+        for gram, a_count in bigrams(answer_word).items():
+            for word, count in self.postings.get(gram, ()):
+                shared[word] += min(count, a_count)
+        found = set()
+        for word, count in shared.items():
+            total_len = len(word) + a_length
+            if count >= min_shared_bigrams(total_len) and min_shared_matches(total_len) <= min(len(word), a_length):
+                found.add(word)
+        # Pairs short enough that the bigram bound is vacuous are checked by length alone
+        for length, words in self.by_length.items():
+            total_len = length + a_length
+            if min_shared_bigrams(total_len) <= 0 and min_shared_matches(total_len) <= min(length, a_length):
+                found.update(words)
+        return found
+
+    def matched_words(self, answer: str) -> FrozenSet[str]:
+        """Reference words with an answer word scoring fuzz.ratio > FUZZY_THRESHOLD"""
+        answer_words = set(answer.lower().split())
+        matched = set(self.words.keys() & answer_words)
+        for a in answer_words:
+            for word in self.candidates(a) - matched:
+                if fuzz.ratio(word, a) > FUZZY_THRESHOLD:
+                    matched.add(word)
+        return frozenset(matched)
+
+    def coverage(self, answer: str) -> float:
+        if not self.total:
+            return 0
+        matched = self.matched_words(answer)
+        return sum(self.words[w] for w in matched) / self.total
+
+
+@lru_cache(maxsize=KEYWORD_INDEX_CACHE_SIZE)
+def fuzzy_index(reference: str) -> FuzzyKeywordIndex:
+    """Fuzzy keyword index for a reference answer, built once and cached"""
+    return FuzzyKeywordIndex(reference)
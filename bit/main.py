@@ -1,23 +1,26 @@
 from fastapi import FastAPI, HTTPException, File, UploadFile
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from sentence_transformers import SentenceTransformer, util
-from sklearn.feature_extraction.text import TfidfVectorizer
-from typing import Optional
+from sentence_transformers import util
+from typing import List, Optional
 import numpy as np
-from keras.models import load_model
-from keras.preprocessing.sequence import pad_sequences
 import pickle
-from PIL import Image
-import pytesseract
-import io
 import re
-from fuzzywuzzy import fuzz
+from embedding_cache import embedding_cache
+from executors import cnn_pool, embedding_pool, run_in
+import ocr
+from ocr import OcrQueueFull, ocr_engine
+from page_classifier import classifier_stats
+from keywords import fuzzy_index, keyword_index
+from grammar import grammar_scorer
+from models import cache_id, default_model, lifespan, model_ids
+from registry import registry, WARMUP_MODE
 
 # -------------------------
 # FastAPI Init
 # -------------------------
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]
@@ -26,17 +29,23 @@ app.add_middleware(
 # -------------------------
 # Models
 # -------------------------
-models = {
-    "MiniLM": SentenceTransformer("all-MiniLM-L6-v2"),
-}
-default_model = "MiniLM"
-
-# Load CNN model + tokenizer
-cnn_model = load_model("cnn_answer_evaluator.h5")
-with open("tokenizer.pkl", "rb") as f:
-    tokenizer = pickle.load(f)
+# Sentence embedding engines (shared with pdf.py) are registered in models.py
 cnn_max_len = 100  # same as during training
 
+def load_cnn():
+    # Keras/TensorFlow import is slow, so it is deferred until the CNN is needed
+    from keras.models import load_model
+    cnn_model = load_model("cnn_answer_evaluator.h5")
+    with open("tokenizer.pkl", "rb") as f:
+        tokenizer = pickle.load(f)
+    return cnn_model, tokenizer
+
+def warm_cnn(cnn):
+    cnn_model, _ = cnn
+    cnn_model.predict(np.zeros((1, 2 * cnn_max_len)), verbose=0)
+
+registry.register("CNN", load_cnn, warmup=warm_cnn)
+
 # -------------------------
 # Schemas
 # -------------------------
@@ -68,40 +77,46 @@ def clean_ocr_text(text: str) -> str:
     return text.strip()
 
 def keyword_coverage(ref: str, ans: str) -> float:
-    vectorizer = TfidfVectorizer(stop_words="english")
-    vectorizer.fit([ref])
-    keywords = vectorizer.get_feature_names_out()
-    matched = sum(1 for kw in keywords if kw in ans.lower())
-    return matched / len(keywords) if len(keywords) else 0
+    return keyword_index(ref).coverage(ans)
 
 def fuzzy_keyword_coverage(ref: str, ans: str) -> float:
-    ref_words = ref.lower().split()
-    ans_words = ans.lower().split()
-    matched = 0
-    for word in ref_words:
-        if any(fuzz.ratio(word, a) > 80 for a in ans_words):
-            matched += 1
-    return matched / len(ref_words) if ref_words else 0
+    return fuzzy_index(ref).coverage(ans)
 
 def grammar_score(text: str) -> float:
-    try:
-        from gingerit.gingerit import GingerIt
-        parser = GingerIt()
-        result = parser.parse(text)
-        corrections = result.get("corrections", [])
-        return max(0, 1 - len(corrections)/max(1, len(text.split())))
-    except Exception:
-        sentences = re.split(r'[.!?]', text)
-        sentence_count = len([s for s in sentences if s.strip()])
-        capitalized = sum(1 for s in sentences if s.strip() and s.strip()[0].isupper())
-        ratio = capitalized / sentence_count if sentence_count else 1
-        return round(ratio, 2)
-
-def compute_similarity(model, ref, ans) -> float:
-    emb1 = model.encode(ref, convert_to_tensor=True)
-    emb2 = model.encode(ans, convert_to_tensor=True)
+    return grammar_scorer.score(text)
+
+def resolve_model_name(name: Optional[str]) -> str:
+    return name if name in model_ids else default_model
+
+def compute_similarity(model_name, ref, ans) -> float:
+    # Reference embeddings come from the shared cache; only the answer is encoded
+    # Queue the answer first so a reference cache miss lands in the same batch
+    encoder = registry.get(model_name)
+    pending = encoder.submit(ans)
+    emb1 = embedding_cache.encode(cache_id(model_name), encoder, [ref])[0]
+    emb2 = pending.result()
     return util.cos_sim(emb1, emb2).item()
 
+def normalize_rows(emb: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(emb, axis=1, keepdims=True)
+    return emb / np.clip(norms, 1e-12, None)
+
+def batch_similarity(model_name, refs: List[str], answers: List[str]) -> np.ndarray:
+    # Encode every unique text in one pass (references via the cache), then take the
+    # row-wise cosine of (ref, answer) pairs
+    encoder = registry.get(model_name)
+    unique_refs = list(dict.fromkeys(refs))
+    unique_answers = list(dict.fromkeys(answers))
+    ref_emb, ans_emb = embedding_cache.encode_with(cache_id(model_name), encoder, unique_refs, unique_answers)
+    ref_emb, ans_emb = normalize_rows(ref_emb), normalize_rows(ans_emb)
+    ref_index = {text: i for i, text in enumerate(unique_refs)}
+    ans_index = {text: i for i, text in enumerate(unique_answers)}
+    return np.einsum(
+        "ij,ij->i",
+        ref_emb[[ref_index[r] for r in refs]],
+        ans_emb[[ans_index[a] for a in answers]],
+    )
+
 def full_feedback(score: float) -> str:
     if score > 8:
         return "Excellent! Relevant, well-structured, and accurate."
@@ -110,68 +125,118 @@ def full_feedback(score: float) -> str:
     else:
         return "Weak answer. Improve relevance, grammar, and completeness."
 
+def advanced_result(data: AnswerRequest, similarity: float, coverage: Optional[float] = None,
+                    grammar: Optional[float] = None) -> AdvancedResult:
+    if coverage is None:
+        coverage = keyword_coverage(data.reference_answer, data.student_answer)
+    if grammar is None:
+        grammar = grammar_score(data.student_answer)
+    final_score = round((0.5 * similarity + 0.3 * coverage + 0.2 * grammar) * 10, 2)
+    return AdvancedResult(
+        question=data.question,
+        student_answer=data.student_answer,
+        similarity=round(similarity, 2),
+        coverage=round(coverage, 2),
+        grammar=round(grammar, 2),
+        final_score=final_score,
+        feedback=full_feedback(final_score),
+    )
+
 # -------------------------
 # Endpoints
 # -------------------------
 
 @app.post("/evaluate_image")
-def evaluate_image(file: UploadFile = File(...), model_answer: str = "", question: str = ""):
+async def evaluate_image(file: UploadFile = File(...), model_answer: str = "", question: str = ""):
     try:
-        # Read image
-        image = Image.open(io.BytesIO(file.file.read()))
-
-        # OCR with better config
-        student_answer = pytesseract.image_to_string(image, config="--psm 6")
+        # OCR with better config, in the OCR process pool
+        image_bytes = await file.read()
+        student_answer = await ocr_engine.run_async(ocr.image_bytes_to_text, image_bytes, "--psm 6")
         student_answer = clean_ocr_text(student_answer)
 
-        # Use embeddings + fuzzy coverage for scoring
-        model = models[default_model]
-        similarity = compute_similarity(model, model_answer, student_answer)
-        coverage = fuzzy_keyword_coverage(model_answer, student_answer)
-        grammar = grammar_score(student_answer)
-
-        # Different weights for image answers (less grammar weight)
-        final_score = round((0.6 * similarity + 0.35 * coverage + 0.05 * grammar) * 10, 2)
-
-        return {
-            "question": question,
-            "student_answer": student_answer,
-            "similarity": round(similarity, 2),
-            "coverage": round(coverage, 2),
-            "grammar": round(grammar, 2),
-            "final_score": final_score,
-            "feedback": full_feedback(final_score),
-            "extracted_text": student_answer
-        }
+        return await run_in(embedding_pool, score_image_answer, question, model_answer, student_answer)
+    except OcrQueueFull as ex:
+        raise HTTPException(status_code=503, detail=f"OCR busy: {ex}")
     except Exception as ex:
         raise HTTPException(status_code=500, detail=f"OCR/Eval error: {ex}")
 
+def score_image_answer(question: str, model_answer: str, student_answer: str) -> dict:
+    # Use embeddings + fuzzy coverage for scoring
+    similarity = compute_similarity(default_model, model_answer, student_answer)
+    coverage = fuzzy_keyword_coverage(model_answer, student_answer)
+    grammar = grammar_score(student_answer)
+
+    # Different weights for image answers (less grammar weight)
+    final_score = round((0.6 * similarity + 0.35 * coverage + 0.05 * grammar) * 10, 2)
+
+    return {
+        "question": question,
+        "student_answer": student_answer,
+        "similarity": round(similarity, 2),
+        "coverage": round(coverage, 2),
+        "grammar": round(grammar, 2),
+        "final_score": final_score,
+        "feedback": full_feedback(final_score),
+        "extracted_text": student_answer
+    }
+
 @app.post("/evaluate_advanced", response_model=AdvancedResult)
-def evaluate_advanced(data: AnswerRequest):
-    model = models.get(data.model_name, models[default_model])
+async def evaluate_advanced(data: AnswerRequest):
+    model_name = resolve_model_name(data.model_name)
     try:
-        similarity = compute_similarity(model, data.reference_answer, data.student_answer)
-        coverage = keyword_coverage(data.reference_answer, data.student_answer)
-        grammar = grammar_score(data.student_answer)
-        final_score = round((0.5 * similarity + 0.3 * coverage + 0.2 * grammar) * 10, 2)
-        return AdvancedResult(
-            question=data.question,
-            student_answer=data.student_answer,
-            similarity=round(similarity, 2),
-            coverage=round(coverage, 2),
-            grammar=round(grammar, 2),
-            final_score=final_score,
-            feedback=full_feedback(final_score),
+        similarity = await run_in(
+            embedding_pool, compute_similarity, model_name, data.reference_answer, data.student_answer
+        )
+        return await run_in(embedding_pool, advanced_result, data, similarity)
+    except Exception as ex:
+        raise HTTPException(status_code=500, detail=f"Evaluation error: {ex}")
+
+def batch_advanced_results(data: List[AnswerRequest]) -> List[AdvancedResult]:
+    # Group items per model so each model runs a single batched encode
+    groups = {}
+    for i, item in enumerate(data):
+        groups.setdefault(resolve_model_name(item.model_name), []).append(i)
+
+    similarities = [0.0] * len(data)
+    for name, indices in groups.items():
+        sims = batch_similarity(
+            name,
+            [data[i].reference_answer for i in indices],
+            [data[i].student_answer for i in indices],
         )
+        for i, sim in zip(indices, sims):
+            similarities[i] = float(sim)
+
+    # Coverage per reference answer, scored over all of its answers at once
+    coverages = [0.0] * len(data)
+    by_reference = {}
+    for i, item in enumerate(data):
+        by_reference.setdefault(item.reference_answer, []).append(i)
+    for ref, indices in by_reference.items():
+        scores = keyword_index(ref).coverage_many(data[i].student_answer for i in indices)
+        for i, score in zip(indices, scores):
+            coverages[i] = score
+
+    grammars = grammar_scorer.score_many([item.student_answer for item in data])
+
+    return [
+        advanced_result(item, sim, cov, gram)
+        for item, sim, cov, gram in zip(data, similarities, coverages, grammars)
+    ]
+
+@app.post("/evaluate_batch", response_model=List[AdvancedResult])
+async def evaluate_batch(data: List[AnswerRequest]):
+    try:
+        return await run_in(embedding_pool, batch_advanced_results, data)
     except Exception as ex:
         raise HTTPException(status_code=500, detail=f"Evaluation error: {ex}")
 
 @app.post("/evaluate")
-def evaluate_basic(data: AnswerRequest):
+async def evaluate_basic(data: AnswerRequest):
     try:
-        model_emb = models[default_model].encode(data.reference_answer, convert_to_tensor=True)
-        student_emb = models[default_model].encode(data.student_answer, convert_to_tensor=True)
-        similarity = util.cos_sim(model_emb, student_emb).item()
+        similarity = await run_in(
+            embedding_pool, compute_similarity, default_model, data.reference_answer, data.student_answer
+        )
         score = round(similarity * 10, 2)
         if score > 8:
             feedback = "Excellent! Your answer is very close to the reference answer."
@@ -188,7 +253,8 @@ def evaluate_basic(data: AnswerRequest):
     except Exception as ex:
         raise HTTPException(status_code=500, detail=f"Evaluation error: {ex}")
 
-def preprocess_cnn_inputs(reference, student):
+def preprocess_cnn_inputs(tokenizer, reference, student):
+    from keras.preprocessing.sequence import pad_sequences
     ref_seq = tokenizer.texts_to_sequences([reference])
     stu_seq = tokenizer.texts_to_sequences([student])
     ref_pad = pad_sequences(ref_seq, maxlen=cnn_max_len)
@@ -196,12 +262,16 @@ def preprocess_cnn_inputs(reference, student):
     combined = np.concatenate([ref_pad, stu_pad], axis=1)
     return combined
 
+def cnn_similarity(reference, student) -> float:
+    cnn_model, tokenizer = registry.get("CNN")
+    x = preprocess_cnn_inputs(tokenizer, reference, student)
+    similarity = cnn_model.predict(x, verbose=0)[0][0]
+    return float(np.clip(similarity, 0, 1))
+
 @app.post("/evaluate_cnn")
-def evaluate_cnn(data: AnswerRequest):
+async def evaluate_cnn(data: AnswerRequest):
     try:
-        x = preprocess_cnn_inputs(data.reference_answer, data.student_answer)
-        similarity = cnn_model.predict(x)[0][0]
-        similarity = float(np.clip(similarity, 0, 1))
+        similarity = await run_in(cnn_pool, cnn_similarity, data.reference_answer, data.student_answer)
         final_score = round(similarity * 10, 2)
 
         if final_score > 8:
@@ -221,6 +291,26 @@ def evaluate_cnn(data: AnswerRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics")
+def metrics():
+    return {
+        "embedding_cache": embedding_cache.stats(),
+        "ocr_cache": ocr_engine.stats(),
+        "page_classifier": classifier_stats.stats(),
+        "grammar": grammar_scorer.stats(),
+        "micro_batching": {
+            name: registry.engine(name).peek().stats()
+            for name in model_ids if registry.engine(name).loaded
+        },
+    }
+
+@app.get("/ready")
+def ready():
+    ready = registry.is_ready()
+    body = {"ready": ready, "warmup_mode": WARMUP_MODE, "engines": registry.status(),
+            "checks": registry.check_status()}
+    return JSONResponse(status_code=200 if ready else 503, content=body)
+
 @app.get("/")
 def read_root():
     return {"message": "Advanced API running! See /docs"}
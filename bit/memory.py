@@ -0,0 +1,55 @@
+"""
+Resident memory measurement.
+RssSampler polls the process RSS from a background thread while a block runs and keeps
+the peak, which the PDF endpoints report per request as peak_rss_mb. The figure is for
+the whole process, so requests running at the same time see each other's allocations.
+"""
+
+import os
+import threading
+from typing import Optional
+
+RSS_SAMPLE_MS = float(os.environ.get("RSS_SAMPLE_MS", 10))
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_bytes() -> int:
+    """Current resident set size of this process (0 where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+class RssSampler:
+    """Context manager recording the peak RSS seen while its block runs"""
+
+    def __init__(self, interval_ms: float = RSS_SAMPLE_MS):
+        self.interval = max(1.0, interval_ms) / 1000.0
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        self.peak_bytes = max(self.peak_bytes, current_rss_bytes())
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self) -> "RssSampler":
+        self._sample()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    @property
+    def peak_mb(self) -> Optional[float]:
+        return round(self.peak_bytes / (1024 * 1024), 1) if self.peak_bytes else None
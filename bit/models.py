@@ -0,0 +1,76 @@
+"""
+Sentence embedding engines shared by the evaluation API (main.py) and the PDF module
+(pdf.py). Each model is registered once in the engine registry, so both modules use
+the same loaded instance, micro-batcher and embedding cache entries. lifespan() warms
+the registry when the application starts and releases it on shutdown.
+"""
+
+import logging
+import os
+from contextlib import asynccontextmanager
+from functools import partial
+
+from sentence_transformers import SentenceTransformer
+
+import onnx_backend
+from batcher import MicroBatcher
+from executors import shutdown_executors
+from registry import registry, WARMUP_MODE
+
+logger = logging.getLogger(__name__)
+
+# Backend of the default model: "torch" (SentenceTransformer) or "onnx" (int8 ONNX Runtime)
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "torch").lower()
+# Also serve the ONNX backend as an optional "MiniLM-ONNX" engine next to a torch default
+ENABLE_ONNX_ENGINE = os.environ.get("ENABLE_ONNX_ENGINE", "0") == "1"
+
+model_ids = {
+    "MiniLM": "all-MiniLM-L6-v2",
+}
+model_backends = {
+    "MiniLM": EMBEDDING_BACKEND,
+}
+if ENABLE_ONNX_ENGINE and EMBEDDING_BACKEND != "onnx":
+    if onnx_backend.available():
+        model_ids["MiniLM-ONNX"] = "all-MiniLM-L6-v2"
+        model_backends["MiniLM-ONNX"] = "onnx"
+    else:
+        logger.warning("ENABLE_ONNX_ENGINE is set but onnxruntime/transformers are not installed")
+default_model = "MiniLM"
+
+
+def cache_id(model_name: str) -> str:
+    # Backends produce slightly different vectors, so they never share cache entries
+    return f"{model_ids[model_name]}:{model_backends[model_name]}"
+
+
+def load_sentence_model(model_id: str, backend: str) -> MicroBatcher:
+    if backend == "onnx":
+        model = onnx_backend.OnnxSentenceEncoder.from_pretrained(model_id)
+    else:
+        model = SentenceTransformer(model_id)
+    # Concurrent requests share forward passes through one micro-batcher per model
+    return MicroBatcher(model)
+
+
+def warm_sentence_model(encoder: MicroBatcher):
+    encoder.encode(["Warm-up sentence for the embedding model."])
+
+
+# Only the default engine is warmed at startup and gates readiness; others load on demand
+for name, model_id in model_ids.items():
+    registry.register(name, partial(load_sentence_model, model_id, model_backends[name]),
+                      warmup=warm_sentence_model, optional=name != default_model)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Warm the required engines at startup (MODEL_WARMUP=startup); release them at shutdown"""
+    if WARMUP_MODE == "startup":
+        registry.warm_up_in_background()
+    yield
+    for name in model_ids:
+        encoder = registry.engine(name).peek()
+        if encoder is not None:
+            encoder.close()
+    shutdown_executors()
@@ -0,0 +1,285 @@
+"""
+OCR engine.
+OcrEngine keeps a pool of long-lived OCR worker processes. Each worker holds one
+tesserocr API instance with its traineddata loaded (falling back to the pytesseract
+binary when tesserocr is not installed). Jobs go through a bounded queue and, once a
+worker picks them up, wait at most OCR_TIMEOUT_S for their result. A timed-out job's
+worker is terminated and the pool rebuilt, as is a pool whose worker died. Results are cached on disk by a hash of the job's
+input and OCR settings (see ocr_cache.py), so identical pages are only OCR'd once.
+Kept free of model imports so workers start quickly.
+"""
+
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+import pytesseract
+from PIL import Image, ImageEnhance
+
+from executors import OCR_WORKERS, get_ocr_pool, ocr_pool_error, reset_ocr_pool
+from ocr_cache import OcrCache, ocr_cache
+from registry import registry
+
+logger = logging.getLogger(__name__)
+
+OCR_LANG = os.environ.get("OCR_LANG", "eng")
+OCR_QUEUE_SIZE = int(os.environ.get("OCR_QUEUE_SIZE", 4 * OCR_WORKERS))
+OCR_TIMEOUT_S = float(os.environ.get("OCR_TIMEOUT_S", 60))
+DEFAULT_CONFIG = "--psm 6"
+DEFAULT_PSM = 6  # single uniform block of text
+# "adaptive": one pass, enhanced retry only below OCR_MIN_CONFIDENCE; "both": always two passes
+OCR_MODE = os.environ.get("OCR_MODE", "adaptive").lower()
+OCR_MIN_CONFIDENCE = float(os.environ.get("OCR_MIN_CONFIDENCE", 70))
+# Bump when OCR preprocessing changes so results cached by older code are not reused
+OCR_CACHE_VERSION = 1
+
+# Per-process tesserocr API, created once by init_worker
+_api = None
+
+
+class OcrResult(NamedTuple):
+    text: str
+    confidence: float  # mean word confidence, 0-100
+    variant: str       # "raw" or "enhanced"
+
+
+class PageBuffer(NamedTuple):
+    """Compact page raster for sending to OCR workers: 8-bit grayscale, row-major"""
+    width: int
+    height: int
+    data: bytes
+
+    @classmethod
+    def from_image(cls, image: Image.Image) -> "PageBuffer":
+        gray = image.convert("L")
+        return cls(gray.width, gray.height, gray.tobytes())
+
+    def to_image(self) -> Image.Image:
+        return Image.frombytes("L", (self.width, self.height), self.data)
+
+
+class OcrQueueFull(RuntimeError):
+    """Raised when no OCR queue slot frees up within the timeout"""
+
+
+def init_worker(lang: str = OCR_LANG, psm: int = DEFAULT_PSM) -> None:
+    """OCR worker initializer: load tesseract once for the life of the process"""
+    global _api
+    try:
+        import tesserocr
+        _api = tesserocr.PyTessBaseAPI(lang=lang, psm=tesserocr.PSM(psm))
+    except ImportError:
+        _api = None
+    except Exception as e:
+        logger.warning(f"tesserocr init failed, using pytesseract: {e}")
+        _api = None
+
+
+def image_to_text(image: Image.Image, config: str = DEFAULT_CONFIG) -> str:
+    """Run tesseract on a PIL image"""
+    if _api is not None and config == DEFAULT_CONFIG:
+        _api.SetImage(image)
+        return _api.GetUTF8Text()
+    return pytesseract.image_to_string(image, config=config)
+
+
+def image_bytes_to_text(data: bytes, config: str = DEFAULT_CONFIG) -> str:
+    """Run tesseract on an encoded image (PNG, JPEG, ...)"""
+    return image_to_text(Image.open(io.BytesIO(data)), config=config)
+
+
+def enhance(image: Image.Image) -> Image.Image:
+    """Contrast-enhanced grayscale copy for faint scans"""
+    return ImageEnhance.Contrast(image.convert('L')).enhance(2.0)
+
+
+def text_with_confidence(image: Image.Image, config: str = DEFAULT_CONFIG) -> Tuple[str, float]:
+    """Single tesseract pass returning the text and mean word confidence"""
+    if _api is not None and config == DEFAULT_CONFIG:
+        _api.SetImage(image)
+        return _api.GetUTF8Text(), float(_api.MeanTextConf())
+
+    data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
+    lines = {}
+    confidences = []
+    for i, word in enumerate(data["text"]):
+        conf = float(data["conf"][i])
+        if not word.strip() or conf < 0:
+            continue
+        confidences.append(conf)
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append(word)
+    text = "\n".join(" ".join(words) for words in lines.values())
+    confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    return text, confidence
+
+
+def adaptive_ocr(image: Image.Image, min_confidence: float = OCR_MIN_CONFIDENCE) -> OcrResult:
+    """OCR once; retry on the enhanced copy only when confidence is below min_confidence"""
+    text, confidence = text_with_confidence(image)
+    result = OcrResult(text.strip(), round(confidence, 2), "raw")
+    if confidence >= min_confidence:
+        return result
+    text, confidence = text_with_confidence(enhance(image))
+    if confidence > result.confidence:
+        return OcrResult(text.strip(), round(confidence, 2), "enhanced")
+    return result
+
+
+def ocr_page(image: Image.Image) -> OcrResult:
+    """OCR a page image with the configured OCR_MODE"""
+    if OCR_MODE == "both":
+        text, confidence = text_with_confidence(image)
+        enhanced_text, enhanced_confidence = text_with_confidence(enhance(image))
+        if len(enhanced_text.strip()) > len(text.strip()):
+            return OcrResult(enhanced_text.strip(), round(enhanced_confidence, 2), "enhanced")
+        return OcrResult(text.strip(), round(confidence, 2), "raw")
+    return adaptive_ocr(image)
+
+
+def ocr_page_buffer(buffer: PageBuffer) -> OcrResult:
+    """ocr_page for a PageBuffer (the form pages are shipped to workers in)"""
+    return ocr_page(buffer.to_image())
+
+
+def cache_key(fn: Callable, args: tuple) -> str:
+    """SHA-256 of an OCR job: the function, its input bytes or pixels and the OCR settings"""
+    digest = hashlib.sha256()
+    settings = (OCR_CACHE_VERSION, fn.__module__, fn.__qualname__, OCR_LANG, DEFAULT_PSM, OCR_MODE, OCR_MIN_CONFIDENCE)
+    digest.update(repr(settings).encode())
+    for arg in args:
+        if isinstance(arg, PageBuffer):
+            digest.update(f"page:{arg.width}x{arg.height}:".encode())
+            digest.update(arg.data)
+        elif isinstance(arg, Image.Image):
+            digest.update(f"image:{arg.mode}:{arg.width}x{arg.height}:".encode())
+            digest.update(arg.tobytes())
+        elif isinstance(arg, bytes):
+            digest.update(b"bytes:")
+            digest.update(arg)
+        else:
+            digest.update(f"arg:{arg!r}".encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def result_to_cache(result: Any) -> Optional[Dict]:
+    if isinstance(result, OcrResult):
+        return result._asdict()
+    if isinstance(result, str):
+        return {"text": result}
+    return None
+
+
+def result_from_cache(value: Dict) -> Any:
+    if "variant" in value:
+        return OcrResult(value["text"], value["confidence"], value["variant"])
+    return value["text"]
+
+
+class OcrEngine:
+    """Bounded job queue in front of the OCR worker pool, with a persistent result cache"""
+
+    def __init__(self, queue_size: int = OCR_QUEUE_SIZE, timeout: float = OCR_TIMEOUT_S,
+                 cache: Optional[OcrCache] = ocr_cache, workers: int = OCR_WORKERS):
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.cache = cache if cache is not None and cache.enabled else None
+        self._slots = threading.BoundedSemaphore(queue_size)
+        # Jobs are only handed to the pool when a worker is free, so the timeout
+        # measures OCR time rather than time spent queued behind other jobs
+        self._workers = threading.BoundedSemaphore(workers)
+
+    def _lookup(self, fn: Callable, args: tuple) -> Tuple[Optional[str], Any]:
+        """(cache key, cached result or None); the key is None when caching is off"""
+        if self.cache is None:
+            return None, None
+        key = cache_key(fn, args)
+        value = self.cache.get(key)
+        return key, result_from_cache(value) if value is not None else None
+
+    def _store(self, key: Optional[str], result: Any) -> None:
+        value = result_to_cache(result)
+        if key is not None and value is not None:
+            self.cache.put(key, value)
+
+    def _release(self, _: Future) -> None:
+        self._workers.release()
+        self._slots.release()
+
+    def _submit(self, fn: Callable, *args) -> Tuple[ProcessPoolExecutor, Future]:
+        """Take a queue slot, wait for a free worker, then hand the job to the pool"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise OcrQueueFull(f"OCR queue full ({self.queue_size} jobs)")
+        if not self._workers.acquire(timeout=self.timeout):
+            self._slots.release()
+            raise OcrQueueFull(f"No OCR worker free within {self.timeout:g}s")
+        try:
+            pool = get_ocr_pool()
+            future = pool.submit(fn, *args)
+        except Exception:
+            self._workers.release()
+            self._slots.release()
+            raise
+        future.add_done_callback(self._release)
+        return pool, future
+
+    def run(self, fn: Callable, *args):
+        """Run an OCR job in a worker and wait for its result (cache hits skip OCR)"""
+        key, cached = self._lookup(fn, args)
+        if cached is not None:
+            return cached
+        for attempt in range(2):
+            pool, future = self._submit(fn, *args)
+            try:
+                result = future.result(timeout=self.timeout)
+                break
+            except FuturesTimeout:
+                # Terminate the stuck worker rather than let it hold a slot indefinitely
+                reset_ocr_pool(pool)
+                raise
+            except BrokenProcessPool:
+                # A worker died (possibly another job's, or one terminated after a
+                # timeout): retry once on a fresh pool
+                reset_ocr_pool(pool)
+                if attempt:
+                    raise
+        self._store(key, result)
+        return result
+
+    async def run_async(self, fn: Callable, *args, cache: bool = True):
+        """
+        Async variant of run(); hashing, cache I/O and waiting for a worker stay off the
+        event loop. cache=False skips the result cache, for jobs that cache their own.
+        """
+        key, cached = await asyncio.to_thread(self._lookup, fn, args) if cache else (None, None)
+        if cached is not None:
+            return cached
+        for attempt in range(2):
+            pool, future = await asyncio.to_thread(self._submit, fn, *args)
+            try:
+                result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+                break
+            except asyncio.TimeoutError:
+                reset_ocr_pool(pool)
+                raise
+            except BrokenProcessPool:
+                reset_ocr_pool(pool)
+                if attempt:
+                    raise
+        await asyncio.to_thread(self._store, key, result)
+        return result
+
+    def stats(self) -> Dict:
+        return self.cache.stats() if self.cache is not None else {"enabled": False}
+
+
+ocr_engine = OcrEngine()
+# A broken worker pool makes /ready fail until the next OCR job replaces it
+registry.add_check("ocr_pool", ocr_pool_error)
@@ -0,0 +1,154 @@
+"""
+Persistent OCR result cache.
+Results are stored on disk as one small JSON file per entry, named after a content hash
+(see ocr.cache_key), so re-submitted scans skip tesseract entirely, across restarts.
+The store is capped at OCR_CACHE_BYTES: reads touch the entry's mtime and the least
+recently used entries are evicted first. Set OCR_CACHE_BYTES=0 to disable it.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Outside the source tree by default, so cached results are never picked up by git
+CACHE_HOME = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+OCR_CACHE_DIR = os.environ.get("OCR_CACHE_DIR", os.path.join(CACHE_HOME, "subjective-answer-evaluator", "ocr"))
+OCR_CACHE_BYTES = int(os.environ.get("OCR_CACHE_BYTES", 256 * 1024 * 1024))
+# Evict down to this share of the cap so eviction does not run on every write
+EVICT_TO = 0.9
+
+
+class OcrCache:
+    """Content-addressed on-disk store of JSON values with an LRU size cap"""
+
+    def __init__(self, directory: str = OCR_CACHE_DIR, max_bytes: int = OCR_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._bytes: Optional[int] = None  # scanned from disk on first write
+        self._evicting = False
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, key: str) -> str:
+        # Two-level fan-out keeps directories small
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)  # mark as recently used
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def record(self, hit: bool) -> None:
+        """Count a lookup made by another process (OCR workers that render pages themselves)"""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self.writes += 1
+
+    def put(self, key: str, value: Dict) -> None:
+        path = self._path(key)
+        data = json.dumps(value).encode("utf-8")
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            existed = os.path.exists(path)
+            # Write then rename, so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"OCR cache write failed: {e}")
+            return
+        with self._lock:
+            self.writes += 1
+            if self._bytes is None:
+                self._bytes = self._scan_bytes()
+            elif not existed:
+                self._bytes += len(data)
+            over = self._bytes > self.max_bytes
+        if over:
+            self._evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield st.st_mtime, st.st_size, path
+
+    def _scan_bytes(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the store is under EVICT_TO of the cap"""
+        with self._lock:
+            if self._evicting:
+                return
+            self._evicting = True
+        try:
+            # The directory walk and deletes run without the lock, so lookups and
+            # writes from other threads are not blocked while a large store is scanned
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            target = self.max_bytes * EVICT_TO
+            evicted = 0
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                evicted += 1
+            with self._lock:
+                self.evictions += evicted
+                self._bytes = total
+        finally:
+            with self._lock:
+                self._evicting = False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "directory": self.directory,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+ocr_cache = OcrCache()
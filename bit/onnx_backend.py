@@ -0,0 +1,187 @@
+"""
+ONNX Runtime backend for sentence-transformer embedding models.
+The torch model is exported to ONNX once, quantized to int8 with dynamic quantization
+and cached on disk; inference then needs only onnxruntime and the tokenizer saved
+next to it, and reproduces the SentenceTransformer pipeline (same tokenizer and
+max_seq_length, mean pooling, L2 normalization).
+
+The export is an offline step; serving only loads an already exported model:
+    python onnx_backend.py [--model-id all-MiniLM-L6-v2]
+
+Check accuracy against the torch backend with:
+    python onnx_backend.py --parity [--tolerance 0.02]
+"""
+
+import argparse
+import logging
+import os
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CACHE_HOME = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+ONNX_CACHE_DIR = os.environ.get("ONNX_CACHE_DIR", os.path.join(CACHE_HOME, "subjective-answer-evaluator", "onnx"))
+ONNX_THREADS = int(os.environ.get("ONNX_THREADS", 0))  # 0 lets onnxruntime decide
+PARITY_TOLERANCE = 0.02
+
+PARITY_PAIRS = [
+    ("Photosynthesis converts light energy into chemical energy stored in glucose.",
+     "Plants use sunlight to make glucose, storing the energy chemically."),
+    ("Mitochondria are the powerhouse of the cell and produce ATP.",
+     "The mitochondria makes energy for the cell."),
+    ("Newton's second law states that force equals mass times acceleration.",
+     "F = ma, the force on a body is its mass multiplied by its acceleration."),
+    ("Water boils at 100 degrees Celsius at sea level.",
+     "The French Revolution began in 1789."),
+    ("DNA carries the genetic instructions of living organisms.",
+     "Genes made of DNA store hereditary information."),
+]
+
+
+def available() -> bool:
+    """True if onnxruntime and a tokenizer implementation are importable"""
+    try:
+        import onnxruntime  # noqa: F401
+        import transformers  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def model_dir(model_id: str) -> str:
+    return os.path.join(ONNX_CACHE_DIR, model_id.replace("/", "__"))
+
+
+def export_quantized(model_id: str, out_dir: str) -> str:
+    """Export the torch model to ONNX and write an int8 dynamically quantized copy"""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(out_dir, exist_ok=True)
+    st_model = SentenceTransformer(model_id, device="cpu")
+    transformer = st_model[0]
+    hf_model = transformer.auto_model.eval()
+    tokenizer = transformer.tokenizer
+    tokenizer.save_pretrained(out_dir)
+    with open(os.path.join(out_dir, "max_seq_length"), "w") as f:
+        f.write(str(st_model.max_seq_length))
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    fp32_path = os.path.join(out_dir, "model.onnx")
+    int8_path = os.path.join(out_dir, "model.int8.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            hf_model,
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    logger.info(f"Exported {model_id} to {int8_path}")
+    return int8_path
+
+
+class OnnxSentenceEncoder:
+    """SentenceTransformer-compatible encode() running a quantized ONNX model"""
+
+    def __init__(self, onnx_path: str, tokenizer_dir: str, max_seq_length: int = 256):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        options = ort.SessionOptions()
+        if ONNX_THREADS:
+            options.intra_op_num_threads = ONNX_THREADS
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_dir)
+        self.max_seq_length = max_seq_length
+
+    @classmethod
+    def from_pretrained(cls, model_id: str) -> "OnnxSentenceEncoder":
+        """Load the quantized model for model_id, exported beforehand with this module's CLI"""
+        out_dir = model_dir(model_id)
+        onnx_path = os.path.join(out_dir, "model.int8.onnx")
+        if not os.path.exists(onnx_path):
+            raise FileNotFoundError(
+                f"No exported ONNX model at {onnx_path}; run 'python onnx_backend.py --model-id {model_id}' first"
+            )
+        with open(os.path.join(out_dir, "max_seq_length")) as f:
+            max_seq_length = int(f.read().strip())
+        return cls(onnx_path, out_dir, max_seq_length)
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        tokens = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np"
+        )
+        feeds = {name: tokens[name].astype(np.int64) for name in self.input_names}
+        hidden = self.session.run(None, feeds)[0]
+        # Mean pooling over real tokens, then L2 normalization, as in all-MiniLM-L6-v2
+        mask = tokens["attention_mask"][..., None].astype(hidden.dtype)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def encode(self, sentences: Union[str, Sequence[str]], batch_size: int = 32, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        embs = np.concatenate([
+            self._encode_batch(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)
+        ])
+        return embs[0] if single else embs
+
+
+def _pair_cosines(model, pairs: Sequence[Tuple[str, str]]) -> np.ndarray:
+    refs = model.encode([r for r, _ in pairs], convert_to_numpy=True)
+    answers = model.encode([a for _, a in pairs], convert_to_numpy=True)
+    refs = refs / np.linalg.norm(refs, axis=1, keepdims=True)
+    answers = answers / np.linalg.norm(answers, axis=1, keepdims=True)
+    return np.einsum("ij,ij->i", refs, answers)
+
+
+def parity_check(model_id: str = "all-MiniLM-L6-v2", pairs: Sequence[Tuple[str, str]] = PARITY_PAIRS,
+                 tolerance: float = PARITY_TOLERANCE) -> dict:
+    """Compare cosine scores of the torch and quantized ONNX backends on the same pairs"""
+    from sentence_transformers import SentenceTransformer
+
+    if not os.path.exists(os.path.join(model_dir(model_id), "model.int8.onnx")):
+        export_quantized(model_id, model_dir(model_id))
+    torch_scores = _pair_cosines(SentenceTransformer(model_id, device="cpu"), pairs)
+    onnx_scores = _pair_cosines(OnnxSentenceEncoder.from_pretrained(model_id), pairs)
+    diffs = np.abs(torch_scores - onnx_scores)
+    return {
+        "model_id": model_id,
+        "pairs": len(pairs),
+        "max_abs_diff": float(diffs.max()),
+        "mean_abs_diff": float(diffs.mean()),
+        "tolerance": tolerance,
+        "passed": bool(diffs.max() <= tolerance),
+        "torch_scores": [round(float(s), 4) for s in torch_scores],
+        "onnx_scores": [round(float(s), 4) for s in onnx_scores],
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Export / verify the quantized ONNX embedding backend")
+    parser.add_argument("--model-id", default="all-MiniLM-L6-v2")
+    parser.add_argument("--parity", action="store_true", help="compare cosine scores against the torch backend")
+    parser.add_argument("--tolerance", type=float, default=PARITY_TOLERANCE)
+    args = parser.parse_args()
+
+    if args.parity:
+        report = parity_check(args.model_id, tolerance=args.tolerance)
+        for key, value in report.items():
+            print(f"{key}: {value}")
+        raise SystemExit(0 if report["passed"] else 1)
+    print(export_quantized(args.model_id, model_dir(args.model_id)))
@@ -0,0 +1,142 @@
+"""
+Fast blank / text / diagram classifier for scanned answer sheet pages.
+Runs on a low-resolution grayscale render (CLASSIFY_ZOOM, a few hundred pixels a side)
+using NumPy only, plus scipy.ndimage for connected components when it is installed:
+- blank: almost no ink pixels, or an almost uniform page (ink ratio / intensity spread)
+- diagram: most of the ink belongs to a few large components spanning the page
+- text: everything else (handwriting is many small word-sized components)
+Blank pages skip OCR entirely; diagram pages are still OCR'd and flagged for manual review.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+try:
+    from scipy import ndimage
+except ImportError:
+    ndimage = None
+
+logger = logging.getLogger(__name__)
+
+BLANK = "blank"
+TEXT = "text"
+DIAGRAM = "diagram"
+
+CLASSIFY_ZOOM = 0.5  # 36 dpi: about 300 x 420 pixels for an A4 page
+INK_LEVEL = 160      # gray values below this count as ink
+BLANK_INK_RATIO = float(os.environ.get("BLANK_INK_RATIO", 0.002))
+BLANK_STD = 3.0
+# Ignore this share of each edge, where scanners leave shadows and punch holes
+MARGIN = 0.04
+# A component is large when its bounding box spans this share of both page dimensions
+LARGE_COMPONENT = 0.10
+DIAGRAM_INK_SHARE = 0.5
+
+if ndimage is None:
+    logger.info("scipy not installed: page classifier will not detect diagram pages")
+
+
+class PageFeatures(NamedTuple):
+    ink_ratio: float
+    std: float
+    components: int
+    large_ink_share: float  # share of ink pixels in large components
+
+
+def page_features(gray: np.ndarray) -> PageFeatures:
+    """Ink ratio, intensity spread and component statistics of a grayscale page"""
+    h, w = gray.shape
+    my, mx = int(h * MARGIN), int(w * MARGIN)
+    gray = gray[my:h - my, mx:w - mx]
+    ink = gray < INK_LEVEL
+    ink_pixels = int(np.count_nonzero(ink))
+    ink_ratio = ink_pixels / ink.size if ink.size else 0.0
+    std = float(gray.std()) if gray.size else 0.0
+    # Components only separate text from diagrams: skip them for pages that are blank anyway
+    if ndimage is None or ink_ratio < BLANK_INK_RATIO or std < BLANK_STD:
+        return PageFeatures(ink_ratio, std, 0, 0.0)
+
+    # Bounding box of every component at once (a find_objects loop costs ms on dense pages)
+    labels, count = ndimage.label(ink)
+    ys, xs = np.nonzero(labels)
+    component = labels[ys, xs]
+    top = np.full(count + 1, gray.shape[0])
+    bottom = np.full(count + 1, -1)
+    left = np.full(count + 1, gray.shape[1])
+    right = np.full(count + 1, -1)
+    np.minimum.at(top, component, ys)
+    np.maximum.at(bottom, component, ys)
+    np.minimum.at(left, component, xs)
+    np.maximum.at(right, component, xs)
+    large = ((bottom - top + 1 >= LARGE_COMPONENT * gray.shape[0])
+             & (right - left + 1 >= LARGE_COMPONENT * gray.shape[1]))
+    large_ink = int(np.bincount(component, minlength=count + 1)[large].sum())
+    return PageFeatures(ink_ratio, std, count, large_ink / ink_pixels)
+
+
+def ink_bbox(gray: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+    """
+    (x0, y0, x1, y1) pixel box around the ink of a grayscale page, ignoring the
+    margins, or None if there is no ink. Rendering only this box keeps scanner
+    borders and empty paper out of OCR.
+    """
+    h, w = gray.shape
+    my, mx = int(h * MARGIN), int(w * MARGIN)
+    ink = gray[my:h - my, mx:w - mx] < INK_LEVEL
+    rows = np.flatnonzero(ink.any(axis=1))
+    if rows.size == 0:
+        return None
+    cols = np.flatnonzero(ink.any(axis=0))
+    return mx + int(cols[0]), my + int(rows[0]), mx + int(cols[-1]) + 1, my + int(rows[-1]) + 1
+
+
+def classify(gray: np.ndarray) -> str:
+    features = page_features(gray)
+    if features.ink_ratio < BLANK_INK_RATIO or features.std < BLANK_STD:
+        return BLANK
+    if features.large_ink_share >= DIAGRAM_INK_SHARE:
+        return DIAGRAM
+    return TEXT
+
+
+class ClassifierStats:
+    """Pages seen per class, OCR jobs skipped and time spent classifying"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages: Dict[str, int] = {BLANK: 0, TEXT: 0, DIAGRAM: 0}
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, kind: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self.pages[kind] += 1
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            classified = sum(self.pages.values())
+            return {
+                "pages": dict(self.pages),
+                "ocr_calls_saved": self.pages[BLANK],
+                "mean_ms": round(self.total_ms / classified, 3) if classified else 0.0,
+                "max_ms": round(self.max_ms, 3),
+                "components": ndimage is not None,
+            }
+
+
+classifier_stats = ClassifierStats()
+
+
+def classify_timed(gray: np.ndarray) -> str:
+    """classify() that also records the result and its cost in classifier_stats"""
+    start = time.perf_counter()
+    kind = classify(gray)
+    classifier_stats.record(kind, (time.perf_counter() - start) * 1000.0)
+    return kind
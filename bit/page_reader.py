@@ -0,0 +1,203 @@
+"""
+Per-page PDF reading for the OCR worker processes.
+PyMuPDF holds the GIL while it parses, extracts text and renders, so fitz work done on
+a thread stalls the event loop for as long as a page takes to render. Answer sheets
+are therefore read here, in the OCR process pool: a job gets the spooled PDF's path
+and a page index, reads the page's text layer (or layout lines), classifies sparse
+pages and renders and OCRs the inked area of the ones that are not blank. Only text and OCR results go
+back to the server; page rasters never leave the worker. OCR results are cached on
+disk by the rendered pixels, as for every other OCR job (see ocr.cache_key).
+Kept free of model and web framework imports so workers start quickly.
+"""
+
+import os
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import fitz
+import numpy as np
+from PIL import Image
+
+import ocr
+import page_classifier
+from ocr import OcrResult, PageBuffer
+from ocr_cache import ocr_cache
+from page_classifier import BLANK, TEXT
+
+RENDER_ZOOM = 2.0
+# Margin kept around the ink of a sparse page when cropping it for OCR, in points
+CROP_PAD_PT = 12.0
+BOLD_FLAG = 16  # span flag bit PyMuPDF sets for bold fonts
+
+
+class PdfReadError(ValueError):
+    """The PDF could not be opened or read; the message is safe to show to clients"""
+
+
+class RawLine(NamedTuple):
+    text: str
+    x0: float   # left edge of the line, in points
+    bold: bool  # first non-blank span is in a bold font
+
+
+class PageRead(NamedTuple):
+    number: int
+    text: str                     # text layer (text mode only)
+    lines: List[RawLine]          # text lines in reading order (layout mode only)
+    kind: str                     # blank / text / diagram (sparse pages are classified)
+    classify_ms: Optional[float]  # time spent classifying, if the page was sparse
+    ocr: Optional[OcrResult]      # OCR of a sparse page that is not blank
+    cache_hit: Optional[bool]     # whether that OCR result came from the cache
+
+
+# Last document opened by this worker: consecutive jobs usually read the same sheet
+_doc: Optional[Tuple[Tuple[str, int, int], "fitz.Document"]] = None
+
+
+def open_document(path: str) -> "fitz.Document":
+    global _doc
+    try:
+        st = os.stat(path)
+        key = (path, st.st_size, st.st_mtime_ns)
+        if _doc is not None and _doc[0] == key:
+            return _doc[1]
+        if _doc is not None:
+            _doc[1].close()
+            _doc = None
+        doc = fitz.open(path, filetype="pdf")
+    except Exception as e:
+        raise PdfReadError("Failed to open PDF") from e
+    _doc = (key, doc)
+    return doc
+
+
+def pixmap_to_image(pix: "fitz.Pixmap") -> Image.Image:
+    """Wrap a grayscale pixmap's samples as a PIL image (no PNG encode/decode)"""
+    return Image.frombuffer("L", (pix.width, pix.height), pix.samples, "raw", "L", pix.stride, 1)
+
+
+def pixmap_to_array(pix: "fitz.Pixmap") -> np.ndarray:
+    """View a grayscale pixmap's samples as an (height, width) uint8 array"""
+    rows = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+    return rows[:, :pix.width]
+
+
+def render_page(page: "fitz.Page", zoom: float = RENDER_ZOOM) -> Image.Image:
+    """Rasterize a PDF page to grayscale for OCR"""
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    return pixmap_to_image(pix)
+
+
+def render_page_buffer(page: "fitz.Page", zoom: float = RENDER_ZOOM, clip: Optional["fitz.Rect"] = None) -> PageBuffer:
+    """Rasterize a PDF page (or only the clip region) to a grayscale PageBuffer"""
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, colorspace=fitz.csGRAY, alpha=False)
+    if pix.stride == pix.width:
+        return PageBuffer(pix.width, pix.height, pix.samples)
+    return PageBuffer.from_image(pixmap_to_image(pix))
+
+
+def classify_page(page: "fitz.Page", clip: Optional["fitz.Rect"] = None
+                  ) -> Tuple[str, float, Optional["fitz.Rect"]]:
+    """
+    Blank / text / diagram from a low-resolution render of the page (or clip), its cost
+    in ms, and the area of the page holding ink, padded by CROP_PAD_PT
+    """
+    zoom = page_classifier.CLASSIFY_ZOOM
+    region = clip if clip is not None else page.rect
+    gray = pixmap_to_array(page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=region,
+                                           colorspace=fitz.csGRAY, alpha=False))
+    start = time.perf_counter()
+    kind = page_classifier.classify(gray)
+    elapsed_ms = (time.perf_counter() - start) * 1000.0
+    box = page_classifier.ink_bbox(gray)
+    if box is None:
+        return kind, elapsed_ms, None
+    x0, y0, x1, y1 = box
+    ink = fitz.Rect(region.x0 + x0 / zoom - CROP_PAD_PT, region.y0 + y0 / zoom - CROP_PAD_PT,
+                    region.x0 + x1 / zoom + CROP_PAD_PT, region.y0 + y1 / zoom + CROP_PAD_PT)
+    return kind, elapsed_ms, ink & region
+
+
+def image_region(page: "fitz.Page") -> "fitz.Rect":
+    """Bounding box of the images on a sparse page (the page itself if it has none)"""
+    boxes = [fitz.Rect(info["bbox"]) & page.rect for info in page.get_image_info()]
+    boxes = [box for box in boxes if not box.is_empty]
+    if not boxes:
+        return page.rect
+    return fitz.Rect(min(b.x0 for b in boxes), min(b.y0 for b in boxes),
+                     max(b.x1 for b in boxes), max(b.y1 for b in boxes))
+
+
+def is_bold(span: Dict) -> bool:
+    return bool(span["flags"] & BOLD_FLAG) or "bold" in span["font"].lower()
+
+
+def raw_lines(page: "fitz.Page") -> List[RawLine]:
+    """Non-blank text lines of a page in reading order, with position and weight"""
+    layout = page.get_text("dict", flags=fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES)
+    lines = []
+    for block in layout["blocks"]:
+        if block.get("type") != 0:
+            continue
+        for line in block["lines"]:
+            spans = [span for span in line["spans"] if span["text"].strip()]
+            if spans:
+                text = "".join(span["text"] for span in line["spans"]).strip()
+                lines.append(RawLine(text, line["bbox"][0], is_bold(spans[0])))
+    return lines
+
+
+def ocr_cached(raster: PageBuffer) -> Tuple[OcrResult, Optional[bool]]:
+    """OCR a rendered page through the on-disk cache; also report whether it was a hit"""
+    if not ocr_cache.enabled:
+        return ocr.ocr_page_buffer(raster), None
+    key = ocr.cache_key(ocr.ocr_page_buffer, (raster,))
+    value = ocr_cache.get(key)
+    if value is not None:
+        return ocr.result_from_cache(value), True
+    result = ocr.ocr_page_buffer(raster)
+    ocr_cache.put(key, ocr.result_to_cache(result))
+    return result, False
+
+
+def count_pages(path: str) -> int:
+    return len(open_document(path))
+
+
+def read_page(path: str, index: int, layout: bool, sparse_chars: int) -> PageRead:
+    """
+    Read one page: its text layer (text mode) or lines (layout mode). Pages with fewer
+    than sparse_chars characters are classified, and OCR'd unless they are blank. Only
+    the inked area is rendered for OCR, within the page's images in layout mode, so a
+    full-page scan is cropped to its handwriting rather than OCR'd whole.
+    """
+    page = open_document(path)[index]
+    try:
+        if layout:
+            text, lines = "", raw_lines(page)
+            chars = sum(len(line.text) for line in lines)
+        else:
+            text, lines = page.get_text(), []
+            chars = len(text.strip())
+    except Exception as e:
+        raise PdfReadError(f"Failed to read page {index + 1}") from e
+    if chars >= sparse_chars:
+        return PageRead(index + 1, text, lines, TEXT, None, None, None)
+
+    region = image_region(page) if layout else None
+    kind, classify_ms, ink = classify_page(page, region)
+    result = hit = None
+    if kind != BLANK:
+        # Faint pages can pass as not blank with no pixel dark enough to count as ink
+        clip = ink if ink is not None and not ink.is_empty else region
+        result, hit = ocr_cached(render_page_buffer(page, clip=clip))
+    return PageRead(index + 1, text, lines, kind, classify_ms, result, hit)
+
+
+def extract_text(path: str) -> Dict[int, str]:
+    """Text layer of every page, by page number"""
+    doc = open_document(path)
+    try:
+        return {page_num + 1: doc[page_num].get_text() for page_num in range(len(doc))}
+    except Exception as e:
+        raise PdfReadError("Failed to extract text") from e
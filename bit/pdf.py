@@ -1,26 +1,81 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from typing import List, Optional, Dict
-import fitz
-from PIL import Image, ImageEnhance
-import pytesseract
-import io
+from typing import AsyncIterator, BinaryIO, Callable, Dict, FrozenSet, List, NamedTuple, Optional, Tuple, Union
+import json
+import zipfile
+import numpy as np
 import re
+import asyncio
+import bisect
 import logging
+import os
+import shutil
+import tempfile
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime
-from sentence_transformers import SentenceTransformer, util
+from embedding_cache import embedding_cache
+from executors import OCR_WORKERS, embedding_pool, pdf_pool, run_in
+from jobs import Job, job_store
+from memory import RssSampler
+from models import cache_id, default_model
+from ocr import OcrQueueFull, OcrResult, ocr_engine
+from ocr_cache import ocr_cache
+import page_reader
+from page_classifier import BLANK, DIAGRAM, TEXT, classifier_stats
+from page_reader import PageRead, PdfReadError, RawLine
+from registry import registry
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/pdf", tags=["PDF Evaluation"])
 
-try:
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    logger.info("PDF Module: Model loaded successfully")
-except Exception as e:
-    logger.error(f"PDF Module: Failed to load model: {e}")
-    model = None
+# Registered exams, oldest evicted first once the store is full
+EXAM_STORE_SIZE = int(os.environ.get("EXAM_STORE_SIZE", 256))
+exam_store: "OrderedDict[str, ExamTemplate]" = OrderedDict()
+
+# Answer sheets graded concurrently by the bulk endpoint
+BULK_CONCURRENCY = int(os.environ.get("BULK_CONCURRENCY", 4))
+# Largest ZIP the bulk endpoint unpacks: answer sheet PDFs and their total uncompressed size
+BULK_ZIP_MAX_SHEETS = int(os.environ.get("BULK_ZIP_MAX_SHEETS", 1000))
+BULK_ZIP_MAX_BYTES = int(os.environ.get("BULK_ZIP_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+
+# Pages with fewer text-layer characters than this are rasterized and OCR'd
+SPARSE_PAGE_CHARS = int(os.environ.get("SPARSE_PAGE_CHARS", 100))
+
+# Uploads are copied to temporary files in chunks of this size and opened by path, so
+# a large scan is never held in memory as a whole
+SPOOL_CHUNK_BYTES = 1024 * 1024
+
+# A PDF given as its bytes or as the path of a spooled file
+PdfSource = Union[bytes, str]
+
+# Called as on_progress(stage, **details) as an evaluation moves through its stages
+ProgressCallback = Callable[..., None]
+
+def no_progress(stage: str, **details) -> None:
+    pass
+
+# How answers are located on a sheet: "text" segments the joined page text on question
+# markers, "layout" detects question headers from line position and font weight
+EXTRACTION_MODES = ("text", "layout")
+EXTRACTION_MODE = os.environ.get("EXTRACTION_MODE", "text").lower()
+
+# The evaluation API's default embedding engine; sharing it keeps one model in memory
+PDF_ENGINE = default_model
+CACHE_ID = cache_id(PDF_ENGINE)
+
+def get_model():
+    """Return the shared similarity model, loading it on first use (None if loading failed)"""
+    try:
+        return registry.get(PDF_ENGINE)
+    except Exception as e:
+        logger.error(f"PDF Module: Failed to load model: {e}")
+        return None
 
 # =============================================
 # SCHEMAS
@@ -34,6 +89,8 @@ class QuestionResult(BaseModel):
     similarity_score: float
     coverage_score: float
     feedback: str
+    ocr_confidence: Optional[float] = None  # set when the answer starts on an OCR'd page
+    ocr_variant: Optional[str] = None
 
 class PDFEvalResult(BaseModel):
     student_name: Optional[str]
@@ -45,58 +102,177 @@ class PDFEvalResult(BaseModel):
     questions_results: List[QuestionResult]
     evaluation_timestamp: str
     processing_time: float
+    peak_rss_mb: Optional[float] = None  # process peak RSS while the request ran
+    blank_pages: List[int] = []    # scanned pages classified as blank, not OCR'd
+    diagram_pages: List[int] = []  # scanned pages classified as diagrams, for manual review
+
+class ExamInfo(BaseModel):
+    exam_id: str
+    exam_name: str
+    total_max_marks: int
+    questions_count: int
+    references_found: int
+    created_at: str
+
+class ClassSummary(BaseModel):
+    exam_name: str
+    students: int
+    failed: int
+    average_percentage: float
+    highest_percentage: float
+    lowest_percentage: float
+    grade_distribution: Dict[str, int]
+    processing_time: float
+    peak_rss_mb: Optional[float] = None
+
+class JobInfo(BaseModel):
+    job_id: str
+    status: str
+    created_at: str
+    stage: str  # most recent stage event
+    elapsed_s: float
+    error: Optional[str] = None
+    result: Optional[PDFEvalResult] = None
+
+class ExamTemplate(NamedTuple):
+    """Parsed question paper and reference answers, reusable across students"""
+    exam_id: str
+    exam_name: str
+    questions: List[Dict]
+    ref_answers: Dict[int, str]
+    ref_embeddings: Dict[int, np.ndarray]  # empty when references are embedded on demand
+    ref_keywords: Dict[int, FrozenSet[str]]
+    created_at: str
 
 # =============================================
 # UTILITY FUNCTIONS
 # =============================================
-def extract_text_from_pdf(pdf_bytes: bytes) -> Dict[int, str]:
-    """Extract text from PDF pages"""
-    try:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        pages_text = {}
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            text = page.get_text()
-            pages_text[page_num + 1] = text
-        doc.close()
-        return pages_text
-    except Exception as e:
-        logger.error(f"PDF text extraction error: {e}")
-        raise HTTPException(status_code=400, detail=f"Failed to extract text: {str(e)}")
+def spool_to_disk(src: BinaryIO, directory: str, suffix: str = ".pdf") -> str:
+    """Copy a file object to a new file in directory in fixed-size chunks; return its path"""
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=directory)
+    with os.fdopen(fd, "wb") as dst:
+        shutil.copyfileobj(src, dst, SPOOL_CHUNK_BYTES)
+    return path
+
+async def spool_upload(upload: UploadFile, directory: str) -> str:
+    """Spool an upload to a temporary file instead of reading it into memory"""
+    await upload.seek(0)
+    suffix = os.path.splitext(upload.filename or "")[1] or ".pdf"
+    return await asyncio.to_thread(spool_to_disk, upload.file, directory, suffix)
+
+def read_text_source(source: PdfSource) -> str:
+    if isinstance(source, str):
+        with open(source, encoding="utf-8") as f:
+            return f.read()
+    return source.decode("utf-8")
 
-def extract_images_from_pdf(pdf_bytes: bytes) -> Dict[int, List[Image.Image]]:
-    """Extract images from PDF for OCR"""
+@asynccontextmanager
+async def pdf_path(pdf: PdfSource):
+    """Path of the PDF, spooling it to a temporary file if it was given as bytes"""
+    if isinstance(pdf, str):
+        yield pdf
+        return
+    fd, path = tempfile.mkstemp(suffix=".pdf")
     try:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        pages_images = {}
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            mat = fitz.Matrix(2.0, 2.0)
-            pix = page.get_pixmap(matrix=mat)
-            img_data = pix.tobytes("png")
-            image = Image.open(io.BytesIO(img_data))
-            pages_images.setdefault(page_num + 1, []).append(image)
-        doc.close()
-        return pages_images
-    except Exception as e:
-        logger.error(f"PDF image extraction error: {e}")
-        raise HTTPException(status_code=400, detail=f"Failed to extract images: {str(e)}")
+        with os.fdopen(fd, "wb") as f:
+            await asyncio.to_thread(f.write, pdf)
+        yield path
+    finally:
+        os.unlink(path)
 
-def ocr_image(image: Image.Image) -> str:
-    """Perform OCR on image"""
+async def run_pdf_job(fn: Callable, *args):
+    """
+    Run a page_reader job in the OCR process pool. PyMuPDF holds the GIL while it reads
+    and renders, so no fitz call on a PDF runs in this process. Failures fail the whole
+    sheet: a page read or OCR'd as empty would be graded as unanswered.
+    """
     try:
-        results = []
-        text1 = pytesseract.image_to_string(image, config='--psm 6')
-        results.append(text1)
-        gray = image.convert('L')
-        enhanced = ImageEnhance.Contrast(gray).enhance(2.0)
-        text2 = pytesseract.image_to_string(enhanced, config='--psm 6')
-        results.append(text2)
-        best_text = max(results, key=len)
-        return best_text.strip()
-    except Exception as e:
-        logger.error(f"OCR error: {e}")
-        return ""
+        return await ocr_engine.run_async(fn, *args, cache=False)
+    except PdfReadError as e:
+        # The worker's traceback (with the underlying error) is attached as the cause
+        logger.warning(f"PDF read failed: {e}", exc_info=True)
+        raise HTTPException(status_code=400, detail=str(e))
+    except OcrQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"OCR busy: {e}")
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Page reading timed out after {ocr_engine.timeout:g}s")
+
+async def extract_text_from_pdf(pdf: PdfSource) -> Dict[int, str]:
+    """Extract text from PDF pages"""
+    async with pdf_path(pdf) as path:
+        return await run_pdf_job(page_reader.extract_text, path)
+
+async def read_sheet_pages(pdf: PdfSource, layout: bool, on_progress: ProgressCallback = no_progress) -> List[PageRead]:
+    """
+    Read every page of an answer sheet in the OCR workers, OCR'ing sparse pages that
+    are not blank. A page is only dispatched once one of OCR_WORKERS slots is free, so
+    a long sheet never queues more work than the workers can take; results come back
+    in page order.
+    """
+    slots = asyncio.Semaphore(OCR_WORKERS)
+    done = 0
+    async with pdf_path(pdf) as path:
+        count = await run_pdf_job(page_reader.count_pages, path)
+
+        async def read(index: int) -> PageRead:
+            nonlocal done
+            try:
+                page = await run_pdf_job(page_reader.read_page, path, index, layout, SPARSE_PAGE_CHARS)
+            finally:
+                slots.release()
+            if page.classify_ms is not None:
+                classifier_stats.record(page.kind, page.classify_ms)
+            if page.cache_hit is not None:
+                ocr_cache.record(page.cache_hit)
+            done += 1
+            on_progress("page_read", page=page.number, done=done, pages=count, ocr=page.ocr is not None)
+            return page
+
+        tasks = []
+        try:
+            for index in range(count):
+                await slots.acquire()
+                tasks.append(asyncio.create_task(read(index)))
+            pages = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    page_kinds = [page.kind for page in pages]
+    blank = page_kinds.count(BLANK)
+    ocr_pages = sum(page.ocr is not None for page in pages)
+    on_progress("pages_extracted", pages=count, ocr_pages=ocr_pages, skipped_pages=blank)
+    on_progress("pages_ocr", pages=ocr_pages)
+    logger.info(f"Read {count} answer sheet pages, OCR'd {ocr_pages} "
+                f"({blank} blank pages skipped, {page_kinds.count(DIAGRAM)} diagram pages flagged)")
+    return pages
+
+async def extract_answer_pages(pdf: PdfSource, on_progress: ProgressCallback = no_progress
+                               ) -> Tuple[Dict[int, str], Dict[int, OcrResult], Dict[int, str]]:
+    """
+    Per-page answer text, OCR details for pages whose sparse text layer was OCR'd, and
+    the page kind of every page that is not plain text (blank and diagram pages)
+    """
+    pages = await read_sheet_pages(pdf, False, on_progress)
+    answer_pages = {page.number: page.ocr.text + "\n" if page.ocr else page.text for page in pages}
+    ocr_results = {page.number: page.ocr for page in pages if page.ocr}
+    page_kinds = {page.number: page.kind for page in pages if page.kind != TEXT}
+    return answer_pages, ocr_results, page_kinds
+
+def join_pages(pages: Dict[int, str]) -> Tuple[str, List[Tuple[int, int]]]:
+    """Join page texts with spaces; also return (start offset, page number) per page"""
+    starts = []
+    offset = 0
+    for page_num, text in pages.items():
+        starts.append((offset, page_num))
+        offset += len(text) + 1
+    return ' '.join(pages.values()), starts
+
+def page_at(starts: List[Tuple[int, int]], offset: int) -> Optional[int]:
+    """Page number containing a character offset of the joined text"""
+    idx = bisect.bisect_right([start for start, _ in starts], offset) - 1
+    return starts[idx][1] if idx >= 0 else None
 
 def clean_extracted_text(text: str) -> str:
     """Clean and normalize extracted text"""
@@ -106,60 +282,218 @@ def clean_extracted_text(text: str) -> str:
     text = re.sub(r'(?i)o\s*2', 'O2', text)
     return text.strip()
 
-def extract_answer_for_question(all_text: str, question_num: int, next_question_num: Optional[int] = None) -> str:
-    """Extract student answer for specific question number"""
-    if next_question_num:
-        pattern_end = fr'(?:q\.?\s*{next_question_num}|question\s*{next_question_num}|{next_question_num}\.)'
-    else:
-        pattern_end = r'\Z'
-
-    patterns = [
-        rf'(?i)q\.?\s*{question_num}[\s:.\)]+(.+?)(?={pattern_end})',
-        rf'(?i)question\s*{question_num}[\s:.\)]+(.+?)(?={pattern_end})',
-        rf'(?i){question_num}\.?\s+(.+?)(?={pattern_end})',
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, all_text, re.DOTALL)
-        if match:
-            answer = match.group(1).strip()
-            return clean_extracted_text(answer)
-
-    lines = all_text.split('\n')
-    in_answer = False
-    answer_lines = []
-    for line in lines:
-        if re.search(rf'(?i)q\.?\s*{question_num}[\s:.\)]', line):
-            in_answer = True
+# "Q1.", "Q.1", "Question 1:" anywhere, or "1." / "1)" / "1 " at the start of a line
+QUESTION_MARKER = re.compile(
+    r'\b(?:question|q)\s*\.?\s*(\d+)[\s:.\)]+'
+    r'|^[ \t]*(\d+)([.\)]?)[ \t]+',
+    re.IGNORECASE | re.MULTILINE
+)
+
+class QuestionMarker(NamedTuple):
+    start: int          # offset of the marker itself
+    content_start: int  # offset where the answer text begins
+    number: int
+    explicit: bool      # "Q"/"Question" prefix rather than a bare number
+    style: str          # character after a bare number: ".", ")" or "" (none)
+
+def find_question_markers(text: str) -> List[QuestionMarker]:
+    """All question markers in text, in order, from a single scan"""
+    markers = []
+    for match in QUESTION_MARKER.finditer(text):
+        explicit = match.group(1) is not None
+        number = int(match.group(1) if explicit else match.group(2))
+        markers.append(QuestionMarker(match.start(), match.end(), number, explicit, match.group(3) or ""))
+    return markers
+
+def select_markers(markers: List[QuestionMarker], question_numbers: List[int]) -> Dict[int, QuestionMarker]:
+    """
+    The marker that starts each question's answer. A question with an explicit
+    "Q"/"Question" marker takes the first one, wherever it appears, so answers written
+    out of order are still found. Bare numbers ("1." / "1)" / "1") are ambiguous with
+    numbered lists inside answers, so they are taken in question order: each is the
+    first marker of its number after the previous question's marker, written in the
+    same style as the first bare marker chosen.
+    """
+    explicit: Dict[int, QuestionMarker] = {}
+    bare: Dict[int, List[QuestionMarker]] = {}
+    for m in markers:
+        if not m.explicit:
+            bare.setdefault(m.number, []).append(m)
+        elif m.number not in explicit:
+            explicit[m.number] = m
+
+    selected = {}
+    position = -1
+    style = None
+    for q_num in question_numbers:
+        if q_num in explicit:
+            marker = explicit[q_num]
+        else:
+            marker = next((m for m in bare.get(q_num, []) if m.start > position
+                           and (style is None or m.style == style)), None)
+            if marker is not None and style is None:
+                style = marker.style
+        if marker is not None:
+            selected[q_num] = marker
+            position = marker.start
+    return selected
+
+def segment_answers(text: str, question_numbers: List[int]) -> Dict[int, Tuple[int, int]]:
+    """
+    Map each question number to the (start, end) span of its answer in text.
+    Markers are found in one pass and chosen by select_markers; each span ends at the
+    next selected marker in the text.
+    """
+    selected = select_markers(find_question_markers(text), list(dict.fromkeys(question_numbers)))
+    return marker_spans(selected, len(text))
+
+def marker_spans(selected: Dict[int, QuestionMarker], length: int) -> Dict[int, Tuple[int, int]]:
+    """(start, end) of each selected question's answer: up to the next selected marker"""
+    ordered = sorted(selected.items(), key=lambda item: item[1].start)
+    spans = {}
+    for i, (q_num, marker) in enumerate(ordered):
+        end = ordered[i + 1][1].start if i + 1 < len(ordered) else length
+        spans[q_num] = (marker.content_start, end)
+    return spans
+
+# =============================================
+# LAYOUT-AWARE EXTRACTION
+# =============================================
+# Header lines must start within this many points of the page's left-most line
+HEADER_INDENT_PT = 12.0
+
+class ExtractedAnswer(NamedTuple):
+    text: str
+    ocr: Optional[OcrResult]  # OCR details of the page the answer starts on, if OCR'd
+
+class LayoutLine(NamedTuple):
+    text: str
+    header: Optional[int]  # question number if the line is laid out as a question header
+    content_start: int     # offset in text where the answer begins
+    explicit: bool         # header has a "Q"/"Question" prefix rather than a bare number
+    style: str             # character after a bare-number header: "." or ")"
+
+class LayoutPage(NamedTuple):
+    number: int
+    lines: List[LayoutLine]
+    kind: str  # blank / text / diagram
+
+def read_layout_lines(raw: List[RawLine]) -> List[LayoutLine]:
+    """
+    Mark the question header candidates among a page's lines. A line is one when it
+    starts with a question marker and is either bold or flush with the left margin
+    (numbered lists inside answers are usually indented and in the body font).
+    """
+    left = min((line.x0 for line in raw), default=0.0)
+    lines = []
+    for text, x0, bold in raw:
+        match = QUESTION_MARKER.match(text + " ")
+        # Unpunctuated bare numbers are too common at the start of answer lines to be headers
+        if match and (match.group(1) or match.group(3)) and (bold or x0 <= left + HEADER_INDENT_PT):
+            explicit = match.group(1) is not None
+            number = int(match.group(1) if explicit else match.group(2))
+            lines.append(LayoutLine(text, number, min(match.end(), len(text)), explicit, match.group(3) or ""))
+        else:
+            lines.append(LayoutLine(text, None, 0, False, ""))
+    return lines
+
+def assign_layout_answers(pages: List[LayoutPage], ocr_results: Dict[int, OcrResult],
+                          question_numbers: List[int]) -> Dict[int, ExtractedAnswer]:
+    """
+    Join the pages' lines in reading order, turning each header line into a question
+    marker; OCR'd pages have no layout, so their markers are found in the OCR text.
+    The markers are then chosen and split exactly as segment_answers does in text mode.
+    """
+    pieces: List[str] = []
+    markers: List[QuestionMarker] = []
+    starts: List[Tuple[int, int]] = []
+    offset = 0
+    for page in pages:
+        starts.append((offset, page.number))
+        if page.number in ocr_results:
+            text = ocr_results[page.number].text
+            markers.extend(m._replace(start=m.start + offset, content_start=m.content_start + offset)
+                           for m in find_question_markers(text))
+            pieces.append(text)
+            offset += len(text) + 1
             continue
-        if next_question_num and re.search(rf'(?i)q\.?\s*{next_question_num}[\s:.\)]', line):
-            break
-        if in_answer:
-            answer_lines.append(line)
-    return clean_extracted_text(' '.join(answer_lines))
-
-def calculate_similarity(reference: str, student: str) -> float:
-    """Calculate semantic similarity between reference and student answer"""
+        for line in page.lines:
+            if line.header is not None:
+                markers.append(QuestionMarker(offset, offset + line.content_start, line.header,
+                                              line.explicit, line.style))
+            pieces.append(line.text)
+            offset += len(line.text) + 1
+    text = "\n".join(pieces)
+
+    selected = select_markers(markers, list(dict.fromkeys(question_numbers)))
+    return {
+        q_num: ExtractedAnswer(clean_extracted_text(text[start:end]),
+                               ocr_results.get(page_at(starts, selected[q_num].start)))
+        for q_num, (start, end) in marker_spans(selected, len(text)).items()
+    }
+
+async def extract_layout_answers(pdf: PdfSource, question_numbers: List[int], on_progress: ProgressCallback = no_progress
+                                 ) -> Tuple[Dict[int, ExtractedAnswer], Dict[int, str]]:
+    """
+    Answers found by page layout, and the kind of every blank or diagram page.
+    Sparse pages are OCR'd on the area covered by their images (the whole page for a scan)
+    and segmented with the question markers, as in text mode.
+    """
+    pages = await read_sheet_pages(pdf, True, on_progress)
+    layout_pages = [LayoutPage(page.number, read_layout_lines(page.lines), page.kind) for page in pages]
+    ocr_results = {page.number: page.ocr for page in pages if page.ocr}
+    page_kinds = {page.number: page.kind for page in pages if page.kind != TEXT}
+    return assign_layout_answers(layout_pages, ocr_results, question_numbers), page_kinds
+
+def calculate_similarities(references: List[str], students: List[str],
+                           ref_embeddings: Optional[np.ndarray] = None) -> np.ndarray:
+    """Similarity of each (reference, student) pair from a single batched encode"""
+    if not references:
+        return np.zeros(0)
+    model = get_model()
     if not model:
-        return 0.0
+        return np.zeros(len(references))
     try:
-        ref_emb = model.encode(reference, convert_to_tensor=True)
-        student_emb = model.encode(student, convert_to_tensor=True)
-        similarity = util.cos_sim(ref_emb, student_emb).item()
+        if ref_embeddings is not None:
+            ref_emb = ref_embeddings
+            student_emb = model.encode(students, convert_to_numpy=True)
+        else:
+            ref_emb, student_emb = embedding_cache.encode_with(CACHE_ID, model, references, students)
+        ref_emb = ref_emb / np.clip(np.linalg.norm(ref_emb, axis=1, keepdims=True), 1e-12, None)
+        student_emb = student_emb / np.clip(np.linalg.norm(student_emb, axis=1, keepdims=True), 1e-12, None)
+        # Diagonal of the cosine matrix, without building the full matrix
+        similarity = np.einsum("ij,ij->i", ref_emb, student_emb)
         return (similarity + 1) / 2
     except Exception as e:
         logger.error(f"Similarity calculation error: {e}")
-        return 0.0
+        return np.zeros(len(references))
+
+def reference_keywords(text: str) -> FrozenSet[str]:
+    """Lowercased words longer than 3 characters, as used for coverage"""
+    return frozenset(word.lower() for word in text.split() if len(word) > 3)
 
-def calculate_coverage(reference: str, student: str) -> float:
+def calculate_coverage(reference: str, student: str, ref_words: Optional[FrozenSet[str]] = None) -> float:
     """Calculate keyword coverage"""
-    ref_words = set(word.lower() for word in reference.split() if len(word) > 3)
-    student_words = set(word.lower() for word in student.split() if len(word) > 3)
+    if ref_words is None:
+        ref_words = reference_keywords(reference)
+    student_words = reference_keywords(student)
     if not ref_words:
         return 0.0
     common = ref_words.intersection(student_words)
     return len(common) / len(ref_words)
 
+def has_reference(ref_ans: str) -> bool:
+    return bool(ref_ans) and ref_ans != "Reference answer not found"
+
+def embed_references(ref_answers: Dict[int, str]) -> Dict[int, np.ndarray]:
+    """Embed every available reference answer in one call"""
+    model = get_model()
+    numbers = [q_num for q_num, ref in ref_answers.items() if has_reference(ref)]
+    if not model or not numbers:
+        return {}
+    embeddings = embedding_cache.encode(CACHE_ID, model, [ref_answers[q_num] for q_num in numbers])
+    return dict(zip(numbers, embeddings))
+
 def calculate_marks(similarity: float, coverage: float, max_marks: int) -> float:
     """Calculate marks based on similarity and coverage"""
     score = (0.6 * similarity + 0.4 * coverage)
@@ -194,6 +528,85 @@ def determine_grade(percentage: float) -> str:
     elif percentage >= 40: return "D"
     else: return "F"
 
+def parse_reference_answers(ref_text: str, questions_data: List[Dict]) -> Dict[int, str]:
+    """Split reference answers text into per-question answers"""
+    spans = segment_answers(ref_text, [q_data['number'] for q_data in questions_data])
+    ref_answers_dict = {}
+    for q_data in questions_data:
+        q_num = q_data['number']
+        ref_ans = clean_extracted_text(ref_text[slice(*spans[q_num])]) if q_num in spans else ""
+        ref_answers_dict[q_num] = ref_ans if ref_ans else "Reference answer not found"
+    return ref_answers_dict
+
+def segment_sheet(questions_data: List[Dict], total_answer_text: str,
+                  page_starts: Optional[List[Tuple[int, int]]] = None,
+                  ocr_results: Optional[Dict[int, OcrResult]] = None) -> Dict[int, ExtractedAnswer]:
+    """Segment the joined answer sheet text once into every question's answer"""
+    spans = segment_answers(total_answer_text, [q_data['number'] for q_data in questions_data])
+    answers = {}
+    for q_num, (start, end) in spans.items():
+        ocr_result = None
+        if page_starts and ocr_results:
+            ocr_result = ocr_results.get(page_at(page_starts, start))
+        answers[q_num] = ExtractedAnswer(clean_extracted_text(total_answer_text[start:end]), ocr_result)
+    return answers
+
+def score_questions(questions_data: List[Dict], ref_answers_dict: Dict[int, str],
+                    answers: Dict[int, ExtractedAnswer],
+                    ref_embeddings: Optional[Dict[int, np.ndarray]] = None,
+                    ref_keywords: Optional[Dict[int, FrozenSet[str]]] = None) -> List[QuestionResult]:
+    """Score the student's extracted answer to every question"""
+    # First pass: collect the pairs that need a similarity
+    extracted = []
+    pairs = []
+    for idx, q_data in enumerate(questions_data):
+        q_num = q_data['number']
+        extracted_ans, ocr_result = answers.get(q_num, ExtractedAnswer("", None))
+        ref_ans = ref_answers_dict.get(q_num, "")
+        if extracted_ans and len(extracted_ans) >= 10 and has_reference(ref_ans):
+            pairs.append((idx, ref_ans, extracted_ans))
+        extracted.append((extracted_ans, ref_ans, ocr_result))
+
+    # One forward pass for all questions (answers only, for registered exams)
+    numbers = [questions_data[idx]['number'] for idx, _, _ in pairs]
+    pair_ref_embeddings = None
+    if pairs and ref_embeddings and all(q_num in ref_embeddings for q_num in numbers):
+        pair_ref_embeddings = np.stack([ref_embeddings[q_num] for q_num in numbers])
+    similarities = calculate_similarities([p[1] for p in pairs], [p[2] for p in pairs], pair_ref_embeddings)
+    similarity_by_idx = {idx: float(sim) for (idx, _, _), sim in zip(pairs, similarities)}
+
+    results = []
+    for idx, (q_data, (extracted_ans, ref_ans, ocr_result)) in enumerate(zip(questions_data, extracted)):
+        if not extracted_ans or len(extracted_ans) < 10:
+            similarity = 0.0
+            coverage = 0.0
+            obtained = 0.0
+            feedback = "No answer detected"
+        elif not has_reference(ref_ans):
+            similarity = 0.5
+            coverage = 0.5
+            obtained = q_data['marks'] * 0.5
+            feedback = "Reference answer not available, estimated score"
+        else:
+            similarity = similarity_by_idx[idx]
+            coverage = calculate_coverage(ref_ans, extracted_ans, (ref_keywords or {}).get(q_data['number']))
+            obtained = calculate_marks(similarity, coverage, q_data['marks'])
+            feedback = generate_feedback(similarity, coverage, obtained, q_data['marks'])
+        
+        results.append(QuestionResult(
+            question_number=q_data['number'],
+            question_text=q_data['text'][:200],
+            extracted_answer=extracted_ans[:300] if extracted_ans else "No answer found",
+            max_marks=q_data['marks'],
+            obtained_marks=obtained,
+            similarity_score=round(similarity, 3),
+            coverage_score=round(coverage, 3),
+            feedback=feedback,
+            ocr_confidence=ocr_result.confidence if ocr_result else None,
+            ocr_variant=ocr_result.variant if ocr_result else None
+        ))
+    return results
+
 def parse_question_paper(text: str) -> List[Dict]:
     """Extract questions and marks from question paper PDF"""
     questions = []
@@ -224,6 +637,232 @@ def parse_question_paper(text: str) -> List[Dict]:
     
     return questions
 
+async def build_exam(qp_pdf: PdfSource, ref_data: PdfSource, ref_filename: str, exam_name: str,
+                     precompute_embeddings: bool = False) -> ExamTemplate:
+    """Parse the question paper and reference answers into an ExamTemplate"""
+    qp_pages = await extract_text_from_pdf(qp_pdf)
+    qp_text = ' '.join(qp_pages.values())
+    questions_data = parse_question_paper(qp_text)
+    
+    logger.info(f"Extracted {len(questions_data)} questions from question paper")
+    
+    if not questions_data:
+        raise HTTPException(status_code=400, detail="Could not extract questions from question paper")
+    
+    # Extract reference answers
+    if (ref_filename or '').endswith('.txt'):
+        ref_text = await run_in(pdf_pool, read_text_source, ref_data)
+    else:
+        ref_pages = await extract_text_from_pdf(ref_data)
+        ref_text = ' '.join(ref_pages.values())
+    
+    logger.info(f"Extracted {len(ref_text)} characters from reference answers")
+    
+    # Parse reference answers
+    ref_answers_dict = await run_in(pdf_pool, parse_reference_answers, ref_text, questions_data)
+    ref_embeddings = await run_in(embedding_pool, embed_references, ref_answers_dict) if precompute_embeddings else {}
+    
+    return ExamTemplate(
+        exam_id=uuid.uuid4().hex,
+        exam_name=exam_name,
+        questions=questions_data,
+        ref_answers=ref_answers_dict,
+        ref_embeddings=ref_embeddings,
+        ref_keywords={q_num: reference_keywords(ref) for q_num, ref in ref_answers_dict.items() if has_reference(ref)},
+        created_at=datetime.now().isoformat()
+    )
+
+async def grade_answer_sheet(exam: ExamTemplate, answer_pdf: PdfSource, student_name: str,
+                             start_time: Optional[datetime] = None,
+                             extraction_mode: str = EXTRACTION_MODE,
+                             on_progress: ProgressCallback = no_progress) -> PDFEvalResult:
+    """Extract and score one student's answer sheet against an exam"""
+    start_time = start_time or datetime.now()
+    
+    # Extract each question's answer
+    if extraction_mode == "layout":
+        answers, page_kinds = await extract_layout_answers(
+            answer_pdf, [q['number'] for q in exam.questions], on_progress
+        )
+    else:
+        answer_pages, ocr_results, page_kinds = await extract_answer_pages(answer_pdf, on_progress)
+        total_answer_text, page_starts = join_pages(answer_pages)
+        logger.info(f"Extracted {len(total_answer_text)} characters from answer sheet")
+        answers = segment_sheet(exam.questions, total_answer_text, page_starts, ocr_results)
+    
+    # Evaluate each question
+    results = await run_in(
+        embedding_pool, score_questions, exam.questions, exam.ref_answers, answers,
+        exam.ref_embeddings, exam.ref_keywords
+    )
+    on_progress("questions_scored", questions=len(results))
+    total_obtained = sum(r.obtained_marks for r in results)
+    total_marks = sum(q['marks'] for q in exam.questions)
+    
+    percentage = (total_obtained / total_marks) * 100 if total_marks > 0 else 0
+    grade = determine_grade(percentage)
+    processing_time = (datetime.now() - start_time).total_seconds()
+    
+    logger.info(f"Evaluation complete: {total_obtained}/{total_marks} ({percentage:.1f}%) - Grade: {grade}")
+    
+    return PDFEvalResult(
+        student_name=student_name or "Anonymous",
+        exam_name=exam.exam_name,
+        total_max_marks=total_marks,
+        total_obtained_marks=round(total_obtained, 2),
+        percentage=round(percentage, 2),
+        grade=grade,
+        questions_results=results,
+        evaluation_timestamp=datetime.now().isoformat(),
+        processing_time=round(processing_time, 2),
+        blank_pages=[page for page, kind in page_kinds.items() if kind == BLANK],
+        diagram_pages=[page for page, kind in page_kinds.items() if kind == DIAGRAM]
+    )
+
+def exam_info(exam: ExamTemplate) -> ExamInfo:
+    return ExamInfo(
+        exam_id=exam.exam_id,
+        exam_name=exam.exam_name,
+        total_max_marks=sum(q['marks'] for q in exam.questions),
+        questions_count=len(exam.questions),
+        references_found=len(exam.ref_keywords),
+        created_at=exam.created_at
+    )
+
+def class_summary(exam_name: str, results: List[PDFEvalResult], failed: int, processing_time: float) -> ClassSummary:
+    percentages = [r.percentage for r in results]
+    grades: Dict[str, int] = {}
+    for r in results:
+        grades[r.grade] = grades.get(r.grade, 0) + 1
+    return ClassSummary(
+        exam_name=exam_name,
+        students=len(results),
+        failed=failed,
+        average_percentage=round(sum(percentages) / len(percentages), 2) if percentages else 0.0,
+        highest_percentage=max(percentages, default=0.0),
+        lowest_percentage=min(percentages, default=0.0),
+        grade_distribution=grades,
+        processing_time=round(processing_time, 2)
+    )
+
+def read_answer_sheets_zip(zip_path: str, directory: str, max_sheets: int = BULK_ZIP_MAX_SHEETS,
+                           max_bytes: int = BULK_ZIP_MAX_BYTES) -> List[Tuple[str, str]]:
+    """
+    (student name, spooled PDF path) for every PDF in a ZIP, named after the file.
+    Archives with more than max_sheets PDFs or more than max_bytes of uncompressed PDF
+    data are rejected before anything is extracted. The sizes are the ones declared in
+    the archive, which zipfile also enforces while reading, so a member cannot expand
+    past its declared size.
+    """
+    with zipfile.ZipFile(zip_path) as archive:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir()
+            and os.path.basename(info.filename).lower().endswith('.pdf')
+            and not os.path.basename(info.filename).startswith('.')
+        ]
+        if len(members) > max_sheets:
+            raise HTTPException(status_code=413, detail=f"ZIP has {len(members)} answer sheets (limit {max_sheets})")
+        total = sum(info.file_size for info in members)
+        if total > max_bytes:
+            raise HTTPException(status_code=413, detail=f"ZIP expands to {total:,} bytes of answer sheets (limit {max_bytes:,})")
+        sheets = []
+        for info in members:
+            with archive.open(info) as member:
+                name = os.path.splitext(os.path.basename(info.filename))[0]
+                sheets.append((name, spool_to_disk(member, directory)))
+    return sheets
+
+async def grade_many(exam: ExamTemplate, sheets: List[Tuple[str, PdfSource]],
+                     concurrency: int = BULK_CONCURRENCY,
+                     extraction_mode: str = EXTRACTION_MODE) -> AsyncIterator[str]:
+    """Grade sheets concurrently, yielding one NDJSON line per student as each finishes"""
+    start_time = datetime.now()
+    slots = asyncio.Semaphore(max(1, concurrency))
+
+    async def grade(name: str, pdf: PdfSource):
+        async with slots:
+            try:
+                return name, await grade_answer_sheet(exam, pdf, name, extraction_mode=extraction_mode), None
+            except HTTPException as e:
+                return name, None, str(e.detail)
+            except Exception as e:
+                # The message can name spooled temp files; keep it in the server log
+                logger.error(f"Bulk evaluation error for {name}: {e}", exc_info=True)
+                return name, None, "Evaluation failed"
+
+    results = []
+    failed = 0
+    tasks = [asyncio.create_task(grade(name, pdf)) for name, pdf in sheets]
+    with RssSampler() as rss:
+        try:
+            for finished in asyncio.as_completed(tasks):
+                name, result, error = await finished
+                if result is None:
+                    failed += 1
+                    yield json.dumps({"type": "error", "student_name": name, "detail": error}) + "\n"
+                else:
+                    results.append(result)
+                    yield json.dumps({"type": "result", "result": result.model_dump()}) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+    summary = class_summary(exam.exam_name, results, failed, (datetime.now() - start_time).total_seconds())
+    summary.peak_rss_mb = rss.peak_mb
+    yield json.dumps({"type": "summary", "summary": summary.model_dump()}) + "\n"
+
+def check_extraction_mode(mode: str) -> str:
+    mode = mode.lower()
+    if mode not in EXTRACTION_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown extraction mode: {mode} (use one of {', '.join(EXTRACTION_MODES)})")
+    return mode
+
+async def run_evaluation_job(job: Job, spool: tempfile.TemporaryDirectory, qp_path: str, ref_path: str,
+                             ref_filename: str, answer_path: str, student_name: str, exam_name: str,
+                             extraction_mode: str):
+    """Body of a background evaluation job; removes the spooled uploads when done"""
+    job.start()
+    try:
+        with RssSampler() as rss:
+            exam = await build_exam(qp_path, ref_path, ref_filename, exam_name)
+            job.emit("exam_parsed", questions=len(exam.questions))
+            result = await grade_answer_sheet(
+                exam, answer_path, student_name, extraction_mode=extraction_mode, on_progress=job.emit
+            )
+        result.peak_rss_mb = rss.peak_mb
+        job.finish(result)
+    except HTTPException as e:
+        job.fail(str(e.detail))
+    except Exception as e:
+        logger.error(f"PDF evaluation job {job.job_id} error: {e}", exc_info=True)
+        job.fail(f"Evaluation error: {str(e)}")
+    finally:
+        spool.cleanup()
+
+def job_info(job: Job) -> JobInfo:
+    last = job.events[-1]
+    return JobInfo(
+        job_id=job.job_id,
+        status=job.status,
+        created_at=job.created_at,
+        stage=last["stage"],
+        elapsed_s=last["elapsed_s"],
+        error=job.error,
+        result=job.result
+    )
+
+def get_job(job_id: str) -> Job:
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+def get_exam(exam_id: str) -> ExamTemplate:
+    exam = exam_store.get(exam_id)
+    if exam is None:
+        raise HTTPException(status_code=404, detail=f"Exam not found: {exam_id}")
+    return exam
+
 # =============================================
 # ENDPOINTS
 # =============================================
@@ -233,141 +872,218 @@ async def evaluate_pdf_direct(
     question_paper: UploadFile = File(..., description="Question paper PDF"),
     reference_answers: UploadFile = File(..., description="Reference answers PDF or text file"),
     student_name: str = Form(""),
-    exam_name: str = Form("Exam Evaluation")
+    exam_name: str = Form("Exam Evaluation"),
+    extraction_mode: str = Form(EXTRACTION_MODE, description="'text' (question markers) or 'layout' (header position and font weight)")
 ):
     """
     Direct PDF evaluation - upload answer sheet, question paper, and reference answers
     """
     start_time = datetime.now()
+    extraction_mode = check_extraction_mode(extraction_mode)
     
     try:
         logger.info(f"Starting PDF evaluation for student: {student_name}, exam: {exam_name}")
         
-        # Extract answer sheet text
-        answer_pdf = await answer_sheet.read()
-        answer_pages = extract_text_from_pdf(answer_pdf)
-        total_answer_text = ' '.join(answer_pages.values())
+        with tempfile.TemporaryDirectory(prefix="pdf-eval-") as spool_dir, RssSampler() as rss:
+            exam = await build_exam(
+                await spool_upload(question_paper, spool_dir), await spool_upload(reference_answers, spool_dir),
+                reference_answers.filename, exam_name
+            )
+            result = await grade_answer_sheet(
+                exam, await spool_upload(answer_sheet, spool_dir), student_name, start_time, extraction_mode
+            )
+        result.peak_rss_mb = rss.peak_mb
+        return result
         
-        logger.info(f"Extracted {len(total_answer_text)} characters from answer sheet")
-        
-        # If sparse, try OCR
-        if len(total_answer_text.strip()) < 100:
-            logger.info("Running OCR on answer sheet...")
-            answer_images = extract_images_from_pdf(answer_pdf)
-            for page_num, images in answer_images.items():
-                ocr_text = ""
-                for img in images:
-                    ocr_text += ocr_image(img) + "\n"
-                answer_pages[page_num] = ocr_text
-            total_answer_text = ' '.join(answer_pages.values())
-            logger.info(f"After OCR: {len(total_answer_text)} characters")
-        
-        # Extract question paper
-        qp_pdf = await question_paper.read()
-        qp_pages = extract_text_from_pdf(qp_pdf)
-        qp_text = ' '.join(qp_pages.values())
-        questions_data = parse_question_paper(qp_text)
-        
-        logger.info(f"Extracted {len(questions_data)} questions from question paper")
-        
-        if not questions_data:
-            raise HTTPException(status_code=400, detail="Could not extract questions from question paper")
-        
-        # Extract reference answers
-        ref_pdf = await reference_answers.read()
-        if reference_answers.filename.endswith('.txt'):
-            ref_text = ref_pdf.decode('utf-8')
-        else:
-            ref_pages = extract_text_from_pdf(ref_pdf)
-            ref_text = ' '.join(ref_pages.values())
-        
-        logger.info(f"Extracted {len(ref_text)} characters from reference answers")
-        
-        # Parse reference answers
-        ref_answers_dict = {}
-        for q_data in questions_data:
-            q_num = q_data['number']
-            patterns = [
-                rf'(?i)q\.?\s*{q_num}[\s:.\)]+(.+?)(?=q\.?\s*{q_num+1}|\Z)',
-                rf'(?i)question\s*{q_num}[\s:.\)]+(.+?)(?=question\s*{q_num+1}|\Z)',
-            ]
-            ref_ans = ""
-            for pattern in patterns:
-                match = re.search(pattern, ref_text, re.DOTALL)
-                if match:
-                    ref_ans = clean_extracted_text(match.group(1))
-                    break
-            ref_answers_dict[q_num] = ref_ans if ref_ans else "Reference answer not found"
-        
-        # Evaluate each question
-        results = []
-        total_obtained = 0.0
-        total_marks = sum(q['marks'] for q in questions_data)
-        
-        for idx, q_data in enumerate(questions_data):
-            q_num = q_data['number']
-            next_q_num = questions_data[idx + 1]['number'] if idx + 1 < len(questions_data) else None
-            
-            extracted_ans = extract_answer_for_question(total_answer_text, q_num, next_q_num)
-            ref_ans = ref_answers_dict.get(q_num, "")
-            
-            if not extracted_ans or len(extracted_ans) < 10:
-                similarity = 0.0
-                coverage = 0.0
-                obtained = 0.0
-                feedback = "No answer detected"
-            elif not ref_ans or ref_ans == "Reference answer not found":
-                similarity = 0.5
-                coverage = 0.5
-                obtained = q_data['marks'] * 0.5
-                feedback = "Reference answer not available, estimated score"
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"PDF evaluation error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Evaluation error: {str(e)}")
+
+@router.post("/jobs", response_model=JobInfo)
+async def create_evaluation_job(
+    answer_sheet: UploadFile = File(..., description="Student's answer sheet PDF"),
+    question_paper: UploadFile = File(..., description="Question paper PDF"),
+    reference_answers: UploadFile = File(..., description="Reference answers PDF or text file"),
+    student_name: str = Form(""),
+    exam_name: str = Form("Exam Evaluation"),
+    extraction_mode: str = Form(EXTRACTION_MODE, description="'text' (question markers) or 'layout' (header position and font weight)")
+):
+    """
+    Start an evaluation in the background and return its job ID right away.
+    Follow progress at /pdf/jobs/{job_id}/events and fetch the result from /pdf/jobs/{job_id}.
+    """
+    extraction_mode = check_extraction_mode(extraction_mode)
+    spool = tempfile.TemporaryDirectory(prefix="pdf-job-")
+    try:
+        qp_path = await spool_upload(question_paper, spool.name)
+        ref_path = await spool_upload(reference_answers, spool.name)
+        answer_path = await spool_upload(answer_sheet, spool.name)
+    except BaseException:
+        spool.cleanup()
+        raise
+    
+    job = job_store.create()
+    job.task = asyncio.create_task(run_evaluation_job(
+        job, spool, qp_path, ref_path, reference_answers.filename, answer_path, student_name, exam_name,
+        extraction_mode
+    ))
+    logger.info(f"Started PDF evaluation job {job.job_id} for student: {student_name}, exam: {exam_name}")
+    return job_info(job)
+
+@router.get("/jobs/{job_id}", response_model=JobInfo)
+def get_job_info(job_id: str):
+    """Job status, with the PDFEvalResult once the job has completed"""
+    return job_info(get_job(job_id))
+
+@router.get("/jobs/{job_id}/result", response_model=PDFEvalResult)
+def get_job_result(job_id: str):
+    """The job's PDFEvalResult (409 while it is still running)"""
+    job = get_job(job_id)
+    if job.error is not None:
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.result is None:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job.status}")
+    return job.result
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, stream_format: str = Query("ndjson", alias="format")):
+    """
+    Stage events with timings (pages extracted, each page OCR'd, questions scored, ...)
+    from the start of the job until it completes or fails, as NDJSON or, with
+    format=sse, as server-sent events.
+    """
+    job = get_job(job_id)
+    if stream_format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail=f"Unknown format: {stream_format} (use ndjson or sse)")
+
+    async def lines() -> AsyncIterator[str]:
+        async for event in job.follow():
+            if stream_format == "sse":
+                yield f"event: {event['stage']}\ndata: {json.dumps(event)}\n\n"
             else:
-                similarity = calculate_similarity(ref_ans, extracted_ans)
-                coverage = calculate_coverage(ref_ans, extracted_ans)
-                obtained = calculate_marks(similarity, coverage, q_data['marks'])
-                feedback = generate_feedback(similarity, coverage, obtained, q_data['marks'])
-            
-            results.append(QuestionResult(
-                question_number=q_num,
-                question_text=q_data['text'][:200],
-                extracted_answer=extracted_ans[:300] if extracted_ans else "No answer found",
-                max_marks=q_data['marks'],
-                obtained_marks=obtained,
-                similarity_score=round(similarity, 3),
-                coverage_score=round(coverage, 3),
-                feedback=feedback
-            ))
-            total_obtained += obtained
-        
-        percentage = (total_obtained / total_marks) * 100 if total_marks > 0 else 0
-        grade = determine_grade(percentage)
-        processing_time = (datetime.now() - start_time).total_seconds()
-        
-        logger.info(f"Evaluation complete: {total_obtained}/{total_marks} ({percentage:.1f}%) - Grade: {grade}")
-        
-        return PDFEvalResult(
-            student_name=student_name or "Anonymous",
-            exam_name=exam_name,
-            total_max_marks=total_marks,
-            total_obtained_marks=round(total_obtained, 2),
-            percentage=round(percentage, 2),
-            grade=grade,
-            questions_results=results,
-            evaluation_timestamp=datetime.now().isoformat(),
-            processing_time=round(processing_time, 2)
-        )
-        
+                yield json.dumps(event) + "\n"
+
+    media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(lines(), media_type=media_type)
+
+@router.post("/exams", response_model=ExamInfo)
+async def register_exam(
+    question_paper: UploadFile = File(..., description="Question paper PDF"),
+    reference_answers: UploadFile = File(..., description="Reference answers PDF or text file"),
+    exam_name: str = Form("Exam Evaluation")
+):
+    """
+    Register an exam once: parse the question paper and reference answers and
+    precompute reference embeddings, then grade students by exam ID
+    """
+    try:
+        with tempfile.TemporaryDirectory(prefix="pdf-exam-") as spool_dir:
+            exam = await build_exam(
+                await spool_upload(question_paper, spool_dir), await spool_upload(reference_answers, spool_dir),
+                reference_answers.filename, exam_name, precompute_embeddings=True
+            )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Exam registration error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Exam registration error: {str(e)}")
+    
+    exam_store[exam.exam_id] = exam
+    while len(exam_store) > EXAM_STORE_SIZE:
+        exam_store.popitem(last=False)
+    logger.info(f"Registered exam {exam.exam_id} ({exam_name}) with {len(exam.questions)} questions")
+    return exam_info(exam)
+
+@router.get("/exams/{exam_id}", response_model=ExamInfo)
+def get_exam_info(exam_id: str):
+    """Registered exam summary"""
+    return exam_info(get_exam(exam_id))
+
+@router.post("/exams/{exam_id}/evaluate", response_model=PDFEvalResult)
+async def evaluate_for_exam(
+    exam_id: str,
+    answer_sheet: UploadFile = File(..., description="Student's answer sheet PDF"),
+    student_name: str = Form(""),
+    extraction_mode: str = Form(EXTRACTION_MODE, description="'text' (question markers) or 'layout' (header position and font weight)")
+):
+    """
+    Grade one student's answer sheet against a registered exam
+    """
+    exam = get_exam(exam_id)
+    extraction_mode = check_extraction_mode(extraction_mode)
+    try:
+        logger.info(f"Starting PDF evaluation for student: {student_name}, exam: {exam.exam_name} ({exam_id})")
+        with tempfile.TemporaryDirectory(prefix="pdf-eval-") as spool_dir, RssSampler() as rss:
+            result = await grade_answer_sheet(
+                exam, await spool_upload(answer_sheet, spool_dir), student_name, extraction_mode=extraction_mode
+            )
+        result.peak_rss_mb = rss.peak_mb
+        return result
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"PDF evaluation error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Evaluation error: {str(e)}")
 
+@router.post("/evaluate_bulk")
+async def evaluate_bulk(
+    question_paper: UploadFile = File(..., description="Question paper PDF"),
+    reference_answers: UploadFile = File(..., description="Reference answers PDF or text file"),
+    answer_sheets_zip: Optional[UploadFile] = File(None, description="ZIP of answer sheet PDFs, one per student"),
+    answer_sheets: Optional[List[UploadFile]] = File(None, description="Answer sheet PDFs, one per student"),
+    exam_name: str = Form("Exam Evaluation"),
+    extraction_mode: str = Form(EXTRACTION_MODE, description="'text' (question markers) or 'layout' (header position and font weight)")
+):
+    """
+    Grade a whole class: one question paper, one reference file and many answer sheets
+    (a ZIP and/or a multi-part list; student names come from the file names).
+    Streams NDJSON: a "result" (or "error") line per student as each finishes,
+    then a final "summary" line. Sheets are spooled to a temporary directory that is
+    removed once the stream ends.
+    """
+    extraction_mode = check_extraction_mode(extraction_mode)
+    spool = tempfile.TemporaryDirectory(prefix="pdf-bulk-")
+    try:
+        exam = await build_exam(
+            await spool_upload(question_paper, spool.name), await spool_upload(reference_answers, spool.name),
+            reference_answers.filename, exam_name, precompute_embeddings=True
+        )
+        sheets = []
+        if answer_sheets_zip is not None:
+            zip_path = await spool_upload(answer_sheets_zip, spool.name)
+            # Unpacking can take a while; keep it off the event loop
+            sheets.extend(await asyncio.to_thread(read_answer_sheets_zip, zip_path, spool.name))
+        for upload in answer_sheets or []:
+            name = os.path.splitext(os.path.basename(upload.filename or "student"))[0]
+            sheets.append((name, await spool_upload(upload, spool.name)))
+        if not sheets:
+            raise HTTPException(status_code=400, detail="No answer sheets uploaded")
+        
+        logger.info(f"Bulk evaluation of {len(sheets)} answer sheets for exam: {exam_name}")
+        response = StreamingResponse(
+            grade_many(exam, sheets, extraction_mode=extraction_mode), media_type="application/x-ndjson",
+            background=BackgroundTask(spool.cleanup)
+        )
+    except HTTPException:
+        spool.cleanup()
+        raise
+    except zipfile.BadZipFile as e:
+        spool.cleanup()
+        raise HTTPException(status_code=400, detail=f"Invalid ZIP file: {str(e)}")
+    except Exception as e:
+        spool.cleanup()
+        logger.error(f"Bulk evaluation error: {e}", exc_info=True)
+        # As in grade_many, the message can name spooled temp files
+        raise HTTPException(status_code=500, detail="Evaluation failed")
+    return response
+
 @router.get("/health")
 def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "model_loaded": model is not None,
+        "model_loaded": registry.engine(PDF_ENGINE).loaded,
         "timestamp": datetime.now().isoformat()
     }
\ No newline at end of file
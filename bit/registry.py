@@ -0,0 +1,149 @@
+"""
+Lazy model registry.
+Engines are registered with a loader and an optional warm-up function. Each engine is
+loaded on first use, or ahead of traffic by warm_up(), and reports its state so the
+/ready probe can tell an orchestrator when every engine is hot. Optional engines are
+only loaded on demand and never make the service unready. Resources that are not
+models (such as the OCR worker pool) add a readiness check instead.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# "startup" loads and warms every engine when the app starts; "lazy" waits for first use
+WARMUP_MODE = os.environ.get("MODEL_WARMUP", "startup").lower()
+
+NOT_LOADED = "not_loaded"
+LOADING = "loading"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+
+class Engine:
+    """A lazily loaded model plus its load/warm-up state"""
+
+    def __init__(self, name: str, loader: Callable, warmup: Optional[Callable] = None, optional: bool = False):
+        self.name = name
+        self.optional = optional
+        self._loader = loader
+        self._warmup = warmup
+        self._instance = None
+        self._lock = threading.Lock()
+        self.state = NOT_LOADED
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+
+    def get(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._load()
+        return self._instance
+
+    def _load(self) -> None:
+        try:
+            self.state = LOADING
+            start = time.perf_counter()
+            instance = self._loader()
+            self.load_seconds = round(time.perf_counter() - start, 3)
+            if self._warmup is not None:
+                self.state = WARMING
+                start = time.perf_counter()
+                self._warmup(instance)
+                self.warmup_seconds = round(time.perf_counter() - start, 3)
+            self._instance = instance
+            self.state = READY
+            self.error = None
+            logger.info(f"Engine {self.name} ready (load {self.load_seconds}s, warm-up {self.warmup_seconds}s)")
+        except Exception as e:
+            self.state = FAILED
+            self.error = str(e)
+            logger.error(f"Engine {self.name} failed to load: {e}")
+            raise
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def peek(self):
+        """Return the instance if already loaded, without triggering a load"""
+        return self._instance
+
+    def status(self) -> Dict:
+        return {
+            "state": self.state,
+            "optional": self.optional,
+            "error": self.error,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+        }
+
+
+class ModelRegistry:
+    """Named collection of lazily loaded engines"""
+
+    def __init__(self):
+        self._engines: Dict[str, Engine] = {}
+        self._checks: Dict[str, Callable[[], Optional[str]]] = {}
+
+    def register(self, name: str, loader: Callable, warmup: Optional[Callable] = None,
+                 optional: bool = False) -> Engine:
+        engine = Engine(name, loader, warmup, optional)
+        self._engines[name] = engine
+        return engine
+
+    def add_check(self, name: str, check: Callable[[], Optional[str]]) -> None:
+        """Extra readiness check for a resource that is not a model; returns an error or None"""
+        self._checks[name] = check
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._engines
+
+    def names(self) -> List[str]:
+        return list(self._engines)
+
+    def engine(self, name: str) -> Engine:
+        return self._engines[name]
+
+    def get(self, name: str):
+        return self._engines[name].get()
+
+    def warm_up(self, names: Optional[Iterable[str]] = None) -> None:
+        """Load and warm the given engines (all required ones by default), logging failures"""
+        if names is None:
+            names = [name for name, engine in self._engines.items() if not engine.optional]
+        for name in names:
+            try:
+                self._engines[name].get()
+            except Exception:
+                pass
+
+    def warm_up_in_background(self, names: Optional[Iterable[str]] = None) -> threading.Thread:
+        thread = threading.Thread(target=self.warm_up, args=(names,), name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def is_ready(self) -> bool:
+        if any(error is not None for error in self.check_status().values()):
+            return False
+        states = [engine.state for engine in self._engines.values() if not engine.optional]
+        if WARMUP_MODE == "lazy":
+            # Engines load on demand; only a failed engine makes the service unready
+            return FAILED not in states
+        return all(state == READY for state in states)
+
+    def status(self) -> Dict[str, Dict]:
+        return {name: engine.status() for name, engine in self._engines.items()}
+
+    def check_status(self) -> Dict[str, Optional[str]]:
+        return {name: check() for name, check in self._checks.items()}
+
+
+registry = ModelRegistry()
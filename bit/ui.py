@@ -964,6 +964,33 @@ def add_to_history(mode, question, score, feedback, grade="N/A"):
     st.session_state.total_evaluations += 1
 
 
+# Progress bar position reached at each stage of a PDF evaluation job
+PDF_JOB_STAGES = {
+    "queued": (0.0, "Queued"),
+    "running": (0.05, "Starting"),
+    "exam_parsed": (0.15, "Question paper and references parsed"),
+    "pages_extracted": (0.85, "Pages read"),
+    "pages_ocr": (0.85, "Scanned pages OCR'd"),
+    "questions_scored": (0.95, "Questions scored"),
+    "completed": (1.0, "Evaluation complete"),
+    "failed": (1.0, "Evaluation failed"),
+}
+
+
+def pdf_job_progress(event, state):
+    """Progress fraction and label for one PDF job event; state carries the current fraction"""
+    stage = event.get("stage")
+    if stage == "page_read":
+        pages, done = event.get("pages", 0), event.get("done", 0)
+        if pages:
+            state["fraction"] = max(state.get("fraction", 0.0), 0.15 + 0.7 * min(done, pages) / pages)
+        label = f"Read page {done}/{pages}"
+    else:
+        fraction, label = PDF_JOB_STAGES.get(stage, (state.get("fraction", 0.0), stage))
+        state["fraction"] = max(state.get("fraction", 0.0), fraction)
+    return state.get("fraction", 0.0), f"{label} ({event.get('elapsed_s', 0):.1f}s)"
+
+
 def create_gauge_chart(score, title="Score"):
     fig = go.Figure(go.Indicator(
         mode="gauge+number",
@@ -2042,15 +2069,29 @@ elif current_page == "pdf":
                         'exam_name': exam_name or "Exam"
                     }
                     
+                    # Start a background job, follow its stage events, then fetch the result
                     response = requests.post(
-                        
-                        
-                        f"{st.session_state.backend_url}/pdf/evaluate_pdf_direct",
+                        f"{st.session_state.backend_url}/pdf/jobs",
                         files=files,
                         data=data,
-                        timeout=120
+                        timeout=60
                     )
                     
+                    if response.status_code == 200:
+                        job_id = response.json()["job_id"]
+                        progress = st.progress(0.0, text="Queued")
+                        progress_state = {}
+                        with requests.get(
+                            f"{st.session_state.backend_url}/pdf/jobs/{job_id}/events",
+                            stream=True,
+                            timeout=(10, None)
+                        ) as events:
+                            for line in events.iter_lines():
+                                if line:
+                                    fraction, label = pdf_job_progress(json.loads(line), progress_state)
+                                    progress.progress(fraction, text=label)
+                        response = requests.get(f"{st.session_state.backend_url}/pdf/jobs/{job_id}/result", timeout=30)
+                    
                     if response.status_code == 200:
                         result = response.json()
                         st.success("✅ Evaluation Complete!")